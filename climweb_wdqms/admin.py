@@ -1,18 +1,159 @@
+import json
+from datetime import datetime, timedelta, timezone
+
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, Min
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+
+from .fields import Variable
+from .models import IngestTask, Station, StationHealth, StationSummary, Transmission, TransmissionSlice
+from .regions import month_range
+
+# Below this estimate the changelist counts rows exactly
+ESTIMATED_COUNT_THRESHOLD = 10000
+
+
+def estimate_count(queryset):
+    """
+    Row count estimated by the Postgres planner from the table statistics, None on other databases
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Avoids a COUNT(*) over millions of rows on every changelist page by using the planner estimate
+    for large results
+    """
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is not None and estimate > ESTIMATED_COUNT_THRESHOLD:
+            return estimate
+        return super().count
+
+
+class VariableListFilter(admin.SimpleListFilter):
+    title = _("Transmission Variable")
+    parameter_name = 'variable'
+
+    def lookups(self, request, model_admin):
+        # fixed choices, no DISTINCT over the transmissions
+        return [(label, label) for label in Variable.labels]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(variable=self.value())
+        return queryset
+
+
+class ReceivedMonthListFilter(admin.SimpleListFilter):
+    title = _("Month Received")
+    parameter_name = 'received_month'
 
-from .models import Station, Transmission
+    def lookups(self, request, model_admin):
+        # every month between the first and the last transmission, two lookups on the received_date index
+        # instead of a DISTINCT over the transmissions
+        bounds = Transmission.objects.aggregate(first=Min('received_date'), last=Max('received_date'))
+        if bounds['first'] is None:
+            return []
+
+        month = bounds['last'].astimezone(timezone.utc).date().replace(day=1)
+        first_month = bounds['first'].astimezone(timezone.utc).date().replace(day=1)
+
+        months = []
+        while month >= first_month:
+            months.append((month.strftime('%Y-%m'), month.strftime('%b %Y')))
+            month = (month - timedelta(days=1)).replace(day=1)
+        return months
+
+    def queryset(self, request, queryset):
+        if not self.value():
+            return queryset
+
+        try:
+            month = datetime.strptime(self.value(), '%Y-%m').date()
+        except ValueError:
+            return queryset.none()
+
+        start, end = month_range(month)
+        # range on the received_date index
+        return queryset.filter(
+            received_date__gte=datetime(start.year, start.month, start.day, tzinfo=timezone.utc),
+            received_date__lt=datetime(end.year, end.month, end.day, tzinfo=timezone.utc),
+        )
 
 
 # Register your models here.
 
 class TransmissionModelAdmin(admin.ModelAdmin):
-    list_filter = ('variable', 'received_date')
-    search_fields = [ 'station__name', 'received_date']
+    list_filter = (VariableListFilter, ReceivedMonthListFilter)
+    search_fields = ['station__name']
+    search_help_text = _("Station name or WIGOS ID")
     list_display = ('station', 'received_date', 'variable', 'received_rate')
+    list_select_related = ('station',)
+    raw_id_fields = ('station',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+
+        # match on the small stations table through its trigram index, then filter the transmissions
+        # on their station foreign key instead of a LIKE join over every transmission
+        search_term = search_term.strip()
+        station_ids = Station.objects.filter(name__icontains=search_term).values_list('wigos_id', flat=True)
+        station_ids = set(station_ids) | set(Station.objects.filter(wigos_id__startswith=search_term)
+                                             .values_list('wigos_id', flat=True))
+
+        return queryset.filter(station_id__in=station_ids), False
+
+
+class TransmissionSliceModelAdmin(admin.ModelAdmin):
+    list_filter = ('country_code', 'variable', 'period')
+    list_display = ('country_code', 'variable', 'date', 'period', 'ingested_at')
+
+
+class IngestTaskModelAdmin(admin.ModelAdmin):
+    list_filter = ('status', 'variable', 'country_code')
+    list_display = ('country_code', 'variable', 'date', 'period', 'status', 'attempts', 'updated_at')
+
+
+class StationHealthModelAdmin(admin.ModelAdmin):
+    list_filter = ('variable', 'status')
+    list_display = ('station', 'variable', 'status', 'ewma_received_rate', 'consecutive_zero_periods',
+                    'last_received_date')
+    list_select_related = ('station',)
+
 
+class StationSummaryModelAdmin(admin.ModelAdmin):
+    list_filter = ('variable',)
+    list_display = ('station', 'variable', 'latest_received_rate', 'avg_received_rate', 'trend',
+                    'latest_received_date')
+    list_select_related = ('station',)
 
 
 admin.site.register(Station)
 admin.site.register(Transmission,TransmissionModelAdmin)
+admin.site.register(TransmissionSlice, TransmissionSliceModelAdmin)
+admin.site.register(IngestTask, IngestTaskModelAdmin)
+admin.site.register(StationHealth, StationHealthModelAdmin)
+admin.site.register(StationSummary, StationSummaryModelAdmin)
 
 
@@ -0,0 +1,129 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+# Slices whose date was at least this many days old when they were fetched are
+# considered final on WDQMS and are served from the cache without revalidation
+DEFAULT_FRESH_DAYS = 7
+
+
+def get_cache_dir():
+    return getattr(settings, "WDQMS_CACHE_DIR", os.path.join("tmp", "wdqms_cache"))
+
+
+def get_fresh_days():
+    return getattr(settings, "WDQMS_CACHE_FRESH_DAYS", DEFAULT_FRESH_DAYS)
+
+
+class ResponseCache:
+    """
+    Content-addressed on-disk store of raw WDQMS responses.
+
+    Bodies are gzipped and stored once under ``objects/`` by the sha256 of their content.
+    Each slice (date, period, variable, centers, baseline) has a small JSON entry under
+    ``index/`` pointing at its body along with the ETag/Last-Modified validators returned by WDQMS.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or get_cache_dir()
+
+    @staticmethod
+    def make_key(date, period, variable, centers, baseline):
+        centers = ",".join(sorted(center.upper() for center in centers))
+        raw = f"{date}|{period}|{variable.lower()}|{centers}|{baseline}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _index_path(self, key):
+        return os.path.join(self.cache_dir, "index", f"{key}.json")
+
+    def _object_path(self, digest):
+        return os.path.join(self.cache_dir, "objects", digest[:2], f"{digest}.csv.gz")
+
+    @staticmethod
+    def _write_atomic(path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # unique per writer, threads of the same process included
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def get(self, key):
+        index_path = self._index_path(key)
+        if not os.path.exists(index_path):
+            return None
+
+        with open(index_path, "r") as f:
+            entry = json.load(f)
+
+        # index entry without its body is useless, treat as a miss
+        if not os.path.exists(self._object_path(entry["sha256"])):
+            return None
+
+        return entry
+
+    def read(self, entry):
+        with gzip.open(self._object_path(entry["sha256"]), "rb") as f:
+            return f.read()
+
+    def put(self, key, content, slice_date, etag=None, last_modified=None):
+        digest = hashlib.sha256(content).hexdigest()
+        object_path = self._object_path(digest)
+
+        if not os.path.exists(object_path):
+            self._write_atomic(object_path, gzip.compress(content))
+
+        entry = {
+            "sha256": digest,
+            "slice_date": slice_date,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": datetime.now(timezone.utc).strftime("%Y-%m-%d"),
+        }
+        self._write_atomic(self._index_path(key), json.dumps(entry).encode("utf-8"))
+
+        return entry
+
+    def touch(self, key, entry, etag=None, last_modified=None):
+        """
+        Record that WDQMS confirmed the cached body is still current, i.e answered 304 Not Modified
+        """
+        entry = dict(
+            entry,
+            etag=etag or entry.get("etag"),
+            last_modified=last_modified or entry.get("last_modified"),
+            fetched_at=datetime.now(timezone.utc).strftime("%Y-%m-%d"),
+        )
+        self._write_atomic(self._index_path(key), json.dumps(entry).encode("utf-8"))
+
+        return entry
+
+    @staticmethod
+    def is_final(entry):
+        """
+        True if the cached body was fetched long enough after its slice date
+        that WDQMS is not expected to change it anymore
+        """
+        slice_date = datetime.strptime(entry["slice_date"], "%Y-%m-%d")
+        fetched_at = datetime.strptime(entry["fetched_at"], "%Y-%m-%d")
+        return (fetched_at - slice_date).days >= get_fresh_days()
+
+    @staticmethod
+    def conditional_headers(entry):
+        headers = {}
+        if entry is None:
+            return headers
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
@@ -0,0 +1,134 @@
+import io
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from climweb_wdqms.cache import ResponseCache
+
+# Define the base URL for the WDQMS csv download
+BASE_URL = "https://wdqms.wmo.int/wdqmsapi/v1/download/synop/six_hour/availability"
+
+# params---> "date=2024-05-01&period=18&variable=pressure&centers=DWD,ECMWF,JMA,NCEP&baseline=OSCAR"
+
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 120
+DEFAULT_POOL_SIZE = 10
+
+CHUNK_SIZE = 64 * 1024
+
+
+def get_timeout():
+    return (
+        getattr(settings, "WDQMS_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT),
+        getattr(settings, "WDQMS_READ_TIMEOUT", DEFAULT_READ_TIMEOUT),
+    )
+
+
+class WDQMSClient:
+    """
+    HTTP client for the WDQMS csv downloads.
+
+    Keeps a single keep-alive session so consecutive downloads reuse the same connection,
+    and goes through the local ResponseCache before hitting the network.
+    A custom ``transport`` (any requests transport adapter) can be mounted in place of the
+    default pooled HTTPAdapter, e.g to serve responses from a local fake.
+    """
+
+    def __init__(self, base_url=BASE_URL, timeout=None, pool_size=None, transport=None, cache=None):
+        self.base_url = base_url
+        self.timeout = timeout or get_timeout()
+        self.cache = cache or ResponseCache()
+
+        if transport is None:
+            pool_size = pool_size or getattr(settings, "WDQMS_POOL_SIZE", DEFAULT_POOL_SIZE)
+            retries = Retry(total=3, backoff_factor=1, status_forcelist=[502, 503, 504], allowed_methods=["GET"])
+            transport = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retries)
+
+        self.session = requests.Session()
+        self.session.headers.update({"Accept-Encoding": "gzip, deflate"})
+        self.session.mount("https://", transport)
+        self.session.mount("http://", transport)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def _get(self, params, headers):
+        """
+        Stream the response body into memory. gzip encoded bodies are decoded on the fly
+        """
+        response = self.session.get(self.base_url, params=params, headers=headers, timeout=self.timeout, stream=True)
+
+        with response:
+            if response.status_code != 200:
+                return response.status_code, response.headers, None
+
+            buffer = io.BytesIO()
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                buffer.write(chunk)
+
+            return response.status_code, response.headers, buffer.getvalue()
+
+    def fetch(self, date, period, variable, centers, baseline, offline=False):
+        """
+        Return the raw csv content for a slice, or None if it could not be retrieved
+        """
+        params = {
+            'date': date,
+            'period': period,
+            'variable': variable,
+            'centers': ','.join(centers),
+            'baseline': baseline
+        }
+        file_name = f"{date}_{period}_{variable}.csv"
+
+        cache_key = self.cache.make_key(date, period, variable, centers, baseline)
+        cached = self.cache.get(cache_key)
+
+        if offline:
+            if cached is None:
+                print(f"CACHE: {file_name} not in cache, skipping.")
+                return None
+
+            print(f"CACHE: Loading {file_name} from cache")
+            return self.cache.read(cached)
+
+        if cached is not None and self.cache.is_final(cached):
+            # slice was fetched after WDQMS settled it, no need to ask again
+            print(f"CACHE: Loading {file_name} from cache")
+            return self.cache.read(cached)
+
+        print(f"DOWNLOAD: Starting download of {file_name}")
+
+        try:
+            status_code, headers, content = self._get(params, self.cache.conditional_headers(cached))
+        except requests.RequestException as e:
+            print(f"Failed to retrieve data. {e}")
+            return None
+
+        if status_code == 304 and cached is not None:
+            print(f"DOWNLOAD: {file_name} not modified, using cached copy.")
+            # a slice confirmed long after its date is final, and no longer revalidated
+            self.cache.touch(cache_key, cached,
+                             etag=headers.get('ETag'),
+                             last_modified=headers.get('Last-Modified'))
+            return self.cache.read(cached)
+
+        # Check if the request was successful
+        if status_code == 200:
+            self.cache.put(cache_key, content, date,
+                           etag=headers.get('ETag'),
+                           last_modified=headers.get('Last-Modified'))
+
+            print(f"DOWNLOAD: {file_name} downloaded successfully.")
+            return content
+
+        print("Failed to retrieve data. Status code:", status_code)
+        return None
@@ -0,0 +1,54 @@
+import re
+
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import decorator_from_middleware
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Quality 5 compresses close to the maximum at a fraction of its CPU cost
+DEFAULT_BROTLI_QUALITY = 5
+
+re_accepts_brotli = re.compile(r"\bbr\b")
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Compress responses with Brotli when the client accepts it and the brotli package is installed,
+    otherwise fall back to Django's gzip compression
+    """
+
+    def process_response(self, request, response):
+        ae = request.META.get("HTTP_ACCEPT_ENCODING", "")
+
+        if brotli is None or response.streaming or not re_accepts_brotli.search(ae):
+            return super().process_response(request, response)
+
+        # It's not worth attempting to compress really short responses.
+        if len(response.content) < 200 or response.has_header("Content-Encoding"):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        quality = getattr(settings, "WDQMS_BROTLI_QUALITY", DEFAULT_BROTLI_QUALITY)
+        compressed_content = brotli.compress(response.content, quality=quality)
+        if len(compressed_content) >= len(response.content):
+            return response
+
+        response.content = compressed_content
+        response.headers["Content-Length"] = str(len(response.content))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = "br"
+
+        return response
+
+
+# per view compression, for projects that do not enable GZipMiddleware globally
+compress_page = decorator_from_middleware(CompressionMiddleware)
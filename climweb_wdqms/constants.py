@@ -0,0 +1,3 @@
+VARIABLES = ['pressure', 'temperature', 'humidity', 'meridional_wind', 'zonal_wind']
+PERIODS = ["00", "06", "12", "18"]
+CENTERS = ["DWD", "ECMWF", "JMA", "NCEP"]
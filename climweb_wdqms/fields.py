@@ -0,0 +1,74 @@
+from django import forms
+from django.core import exceptions
+from django.db import models
+from django.db.models.fields import BLANK_CHOICE_DASH
+
+
+class Variable(models.IntegerChoices):
+    PRESSURE = 1, 'pressure'
+    TEMPERATURE = 2, 'temperature'
+    HUMIDITY = 3, 'humidity'
+    MERIDIONAL_WIND = 4, 'meridional_wind'
+    ZONAL_WIND = 5, 'zonal_wind'
+
+
+class Center(models.IntegerChoices):
+    DWD = 1, 'DWD'
+    ECMWF = 2, 'ECMWF'
+    JMA = 3, 'JMA'
+    NCEP = 4, 'NCEP'
+
+
+class LabelChoiceField(models.PositiveSmallIntegerField):
+    """
+    Stores one of a fixed set of names as a small integer while reading and writing it by name,
+    e.g filter(variable='pressure') and values('variable') work with names as with a CharField
+    """
+    choices_class = None
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return self.choices_class(value).label
+
+    def to_python(self, value):
+        if value is None or isinstance(value, str):
+            return value
+        return self.choices_class(int(value)).label
+
+    def get_prep_value(self, value):
+        if value is None:
+            return None
+        if isinstance(value, str):
+            try:
+                return self.choices_class[value.upper()].value
+            except KeyError:
+                # unknown names match nothing in lookups and fail the not null constraint on save
+                return None
+        return int(value)
+
+    @property
+    def validators(self):
+        # the integer range validators do not apply to the names
+        return list(self._validators)
+
+    def validate(self, value, model_instance):
+        super().validate(value, model_instance)
+        if value is not None and value not in self.choices_class.labels:
+            raise exceptions.ValidationError(f"'{value}' is not a valid {self.verbose_name}", code='invalid_choice')
+
+    def formfield(self, **kwargs):
+        # a select of the names, not the integer input of PositiveSmallIntegerField
+        choices = [(label, label) for label in self.choices_class.labels]
+        if self.blank or self.null:
+            choices = BLANK_CHOICE_DASH + choices
+        return models.Field.formfield(self, **{'form_class': forms.TypedChoiceField, 'choices': choices,
+                                               'coerce': str, 'empty_value': None, **kwargs})
+
+
+class VariableField(LabelChoiceField):
+    choices_class = Variable
+
+
+class CenterField(LabelChoiceField):
+    choices_class = Center
@@ -0,0 +1,97 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from climweb_wdqms.models import StationHealth, Transmission
+from climweb_wdqms.summaries import recent_window
+
+# Stored periods the statistics are computed over, a week. Older periods weigh less than 0.01% of the average
+DEFAULT_HEALTH_PERIODS = 28
+
+# Hours between two synop periods
+PERIOD_HOURS = 6
+
+# Weight of the newest period in the smoothed transmission rate
+DEFAULT_EWMA_ALPHA = 0.3
+
+# Smoothed transmission rate (%) below which a station is degraded
+DEFAULT_DEGRADED_RATE = 50
+
+# Consecutive periods without any transmission after which a station is silent. 4 periods is one day
+DEFAULT_SILENT_PERIODS = 4
+
+
+def get_status(ewma_received_rate, consecutive_zero_periods):
+    if consecutive_zero_periods >= getattr(settings, "WDQMS_SILENT_PERIODS", DEFAULT_SILENT_PERIODS):
+        return StationHealth.STATUS_SILENT
+    if ewma_received_rate < getattr(settings, "WDQMS_DEGRADED_RATE", DEFAULT_DEGRADED_RATE):
+        return StationHealth.STATUS_DEGRADED
+    return StationHealth.STATUS_OK
+
+
+def compute_station_health(station_id, variable, transmissions, now):
+    """
+    Health of a station from its transmissions, given as (received_date, received_rate, received) oldest first
+    """
+    alpha = getattr(settings, "WDQMS_EWMA_ALPHA", DEFAULT_EWMA_ALPHA)
+
+    ewma_received_rate = None
+    consecutive_zero_periods = 0
+    for _, received_rate, received in transmissions:
+        received_rate = float(received_rate)
+        if ewma_received_rate is None:
+            ewma_received_rate = received_rate
+        else:
+            ewma_received_rate = alpha * received_rate + (1 - alpha) * ewma_received_rate
+        consecutive_zero_periods = 0 if received else consecutive_zero_periods + 1
+
+    return StationHealth(
+        station_id=station_id,
+        variable=variable,
+        ewma_received_rate=ewma_received_rate,
+        consecutive_zero_periods=consecutive_zero_periods,
+        last_received_rate=float(transmissions[-1][1]),
+        last_received_date=transmissions[-1][0],
+        status=get_status(ewma_received_rate, consecutive_zero_periods),
+        updated_at=now,
+    )
+
+
+def update_station_health(station_ids, variable):
+    """
+    Recompute the rolling statistics of the given stations for a variable from their stored transmissions of the
+    last WDQMS_HEALTH_PERIODS periods. The result only depends on the stored rows, so slices ingested out of order, again,
+    or by concurrent workers all end up with the same health
+    """
+    station_ids = set(station_ids)
+    if not station_ids:
+        return 0
+
+    periods = getattr(settings, "WDQMS_HEALTH_PERIODS", DEFAULT_HEALTH_PERIODS)
+    now = timezone.now()
+
+    # only the last periods of each station are read, on the (station, variable, received_date) index
+    window = recent_window(station_ids, variable, timedelta(hours=periods * PERIOD_HOURS))
+    if window is None:
+        return 0
+
+    rows = Transmission.objects.filter(window).values_list('station_id', 'received_date', 'received_rate', 'received')
+
+    transmissions = {}
+    for station_id, received_date, received_rate, received in sorted(rows, key=lambda row: row[1]):
+        transmissions.setdefault(station_id, []).append((received_date, received_rate, received))
+
+    health = [compute_station_health(station_id, variable, station_transmissions, now)
+              for station_id, station_transmissions in transmissions.items()]
+
+    StationHealth.objects.bulk_create(
+        health,
+        update_conflicts=True,
+        unique_fields=['station', 'variable'],
+        update_fields=['ewma_received_rate', 'consecutive_zero_periods', 'last_received_rate', 'last_received_date',
+                       'status', 'updated_at'],
+        batch_size=500,
+    )
+
+    return len(health)
@@ -0,0 +1,531 @@
+import hashlib
+import io
+import queue
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.db import transaction
+from django.utils import timezone
+
+from climweb_wdqms.client import WDQMSClient
+from climweb_wdqms.health import update_station_health
+from climweb_wdqms.constants import CENTERS
+from climweb_wdqms.models import CenterTransmission, Station, Transmission, TransmissionSlice
+from climweb_wdqms.regions import refresh_region_rollups
+from climweb_wdqms.rollups import refresh_rollups
+from climweb_wdqms.summaries import refresh_station_summaries
+from climweb_wdqms.routers import bump_data_version
+
+BASELINE = "OSCAR"
+
+# Number of downloaded slices waiting to be written
+DEFAULT_PREFETCH_SLICES = 2
+
+# Ceiling for the memory held by downloaded slices waiting to be written
+DEFAULT_MAX_MEMORY_MB = 256
+
+# Rows written per batch
+DEFAULT_WRITE_BATCH_SIZE = 1000
+
+# Columns read from the WDQMS csv, everything else is dropped while parsing
+CSV_COLUMNS = ['wigosid', 'name', 'longitude', 'latitude', 'in OSCAR', 'country code', 'center', 'variable', 'date',
+               '#received', '#expected']
+
+# Columns kept for the per center breakdown
+CENTER_COLUMNS = ['wigosid', 'variable', 'date', 'center', '#received', '#expected']
+
+# Columns that make up the content of a slice for change detection
+SLICE_HASH_COLUMNS = ['wigosid', 'name', 'longitude', 'latitude', 'in OSCAR', 'variable', 'date', '#received', '#expected']
+
+def get_per_center(per_center=None):
+    if per_center is None:
+        return getattr(settings, "WDQMS_STORE_CENTERS", False)
+    return per_center
+
+
+def download_transmission_rate_csv(client, date, period, variable, centers, baseline, country_code, offline=False,
+                                   per_center=False):
+    """
+    Returns the slice with one row per station, the best center's, and if per_center is set
+    the counts of every center for the station. (None, None) if the slice is not available
+    """
+
+    content = client.fetch(date, period, variable, centers, baseline, offline=offline)
+
+    if content is None:
+        return None, None
+
+    # Load the CSV data into a DataFrame
+    df = pd.read_csv(io.BytesIO(content), usecols=CSV_COLUMNS)
+
+    df_filtered = df[df['country code'] == country_code]
+
+    # Assuming df_filtered is your DataFrame
+    df_filtered = df_filtered.copy()
+    df_filtered['received_rate'] = (df_filtered['#received'] / df_filtered['#expected']) * 100
+
+    center_rates = None
+    if per_center:
+        # every center's counts, taken before the rows are collapsed to the best center
+        center_rates = df_filtered.loc[df_filtered['center'].isin(CENTERS), CENTER_COLUMNS]
+
+     # Group by 'name' and select the row with the highest 'received rate'
+    max_rate_indices = df_filtered.groupby('wigosid')['received_rate'].idxmax()
+    df_filtered = df_filtered.loc[max_rate_indices]
+    df_filtered.replace([np.inf, -np.inf], 0, inplace=True)
+
+    return df_filtered, center_rates
+
+def generate_date_range(start_date, end_date):
+    current_date = datetime.strptime(start_date, "%Y-%m-%d")
+    end_date = datetime.strptime(end_date, "%Y-%m-%d")
+    while current_date <= end_date:
+        yield current_date.strftime('%Y-%m-%d')
+        current_date += timedelta(days=1)
+
+
+def iter_slices(start_date, end_date, periods):
+    for date in generate_date_range(start_date, end_date):
+        for period in periods:
+            yield date, period
+
+
+def iter_frames(client, slices, variable, centers, country_code, offline=False, per_center=False):
+    for date, period in slices:
+        trans_rates, center_rates = download_transmission_rate_csv(client, date, period, variable, centers, BASELINE,
+                                                                   country_code, offline=offline,
+                                                                   per_center=per_center)
+        if trans_rates is not None:
+            yield date, period, trans_rates, center_rates
+
+
+def frame_size(*frames):
+    return int(sum(frame.memory_usage(deep=True).sum() for frame in frames if frame is not None))
+
+
+def iter_batches(trans_rates, batch_size):
+    for start in range(0, len(trans_rates), batch_size):
+        yield trans_rates.iloc[start:start + batch_size]
+
+
+class MemoryBudget:
+    """
+    Tracks the memory held by frames waiting to be written and blocks the producer
+    while taking another frame would go over the ceiling
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.used = 0
+        self.condition = threading.Condition()
+
+    def acquire(self, size):
+        with self.condition:
+            # a single frame larger than the ceiling is still let through on its own
+            while self.used and self.used + size > self.max_bytes:
+                self.condition.wait()
+            self.used += size
+
+    def release(self, size):
+        with self.condition:
+            self.used -= size
+            self.condition.notify_all()
+
+
+def prefetch(frames, max_pending=None, max_memory_mb=None):
+    """
+    Download and parse frames in a background thread while the caller writes to the database.
+    At most max_pending frames, and max_memory_mb of frame memory, are held at any time
+    """
+    max_pending = max_pending or getattr(settings, "WDQMS_PREFETCH_SLICES", DEFAULT_PREFETCH_SLICES)
+    max_memory_mb = max_memory_mb or getattr(settings, "WDQMS_MAX_MEMORY_MB", DEFAULT_MAX_MEMORY_MB)
+
+    budget = MemoryBudget(max_memory_mb * 1024 * 1024)
+    pending = queue.Queue(maxsize=max_pending)
+    stop = threading.Event()
+    done = object()
+
+    def produce():
+        try:
+            for item in frames:
+                if stop.is_set():
+                    break
+                size = frame_size(*item[2:])
+                budget.acquire(size)
+                pending.put((item, size))
+        except Exception as e:
+            pending.put((e, 0))
+        pending.put((done, 0))
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+
+    try:
+        while True:
+            item, size = pending.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            try:
+                yield item
+            finally:
+                budget.release(size)
+    finally:
+        # unblock the producer if the consumer stopped early
+        stop.set()
+        while producer.is_alive():
+            try:
+                _, size = pending.get(timeout=0.1)
+                budget.release(size)
+            except queue.Empty:
+                pass
+
+
+def hash_slice(trans_rates, center_rates=None):
+    """
+    sha256 of the filtered slice content, independent of the row order in the CSV
+    """
+    content_hash = hashlib.sha256()
+
+    df = trans_rates[SLICE_HASH_COLUMNS].sort_values('wigosid')
+    content_hash.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+
+    if center_rates is not None:
+        df = center_rates.sort_values(['wigosid', 'center'])
+        content_hash.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+
+    return content_hash.hexdigest()
+
+
+def to_count(value):
+    return None if pd.isna(value) else int(value)
+
+
+def to_rate(value):
+    # rounded so re-ingesting the same value compares equal to the stored one
+    return round(float(value), 2)
+
+
+class StationSync:
+    """
+    Station metadata stage of an ingest run.
+
+    Stations missing from the db are created as slices come in, so transmissions only need their foreign key.
+    The latest name, location, OSCAR flag and country seen for every station are kept in memory and compared
+    with the db once, at the end of the run, in a single bulk_update. One instance is shared by all the
+    ingests of a command, including the threads of the queue worker
+    """
+
+    def __init__(self):
+        self.known_ids = set()
+        # wigos_id -> ((date, period), (name, longitude, latitude, in_oscar, country_code))
+        self.metadata = {}
+        self.lock = threading.Lock()
+
+    def add(self, trans_rates, date, period):
+        """
+        Record the station metadata of a slice and create the stations not stored yet
+        """
+        with self.lock:
+            self._add(trans_rates, date, period)
+
+    def _add(self, trans_rates, date, period):
+        slice_key = (date, period)
+        columns = trans_rates[['wigosid', 'name', 'longitude', 'latitude', 'in OSCAR', 'country code']]
+
+        for wigos_id, name, longitude, latitude, in_oscar, country_code in columns.itertuples(index=False, name=None):
+            # slices of a run can arrive in any order, keep the metadata of the latest one
+            seen = self.metadata.get(wigos_id)
+            if seen is None or seen[0] <= slice_key:
+                self.metadata[wigos_id] = (slice_key, (name, float(longitude), float(latitude), bool(in_oscar),
+                                                       country_code))
+
+        unknown_ids = set(trans_rates['wigosid']) - self.known_ids
+        if not unknown_ids:
+            return
+
+        self.known_ids.update(Station.objects.filter(wigos_id__in=unknown_ids).values_list('wigos_id', flat=True))
+
+        Station.objects.bulk_create([
+            self.to_station(wigos_id) for wigos_id in unknown_ids - self.known_ids
+        ], ignore_conflicts=True)
+        self.known_ids.update(unknown_ids)
+
+    def to_station(self, wigos_id):
+        name, longitude, latitude, in_oscar, country_code = self.metadata[wigos_id][1]
+        return Station(wigos_id=wigos_id, name=name, geom=Point(longitude, latitude, srid=4326), in_oscar=in_oscar,
+                       country_code=country_code)
+
+    def apply(self):
+        """
+        Write the metadata changes recorded since the last apply. Returns the number of updated stations
+        """
+        with self.lock:
+            updated = self._apply()
+            self.metadata = {}
+        return updated
+
+    def _apply(self):
+        if not self.metadata:
+            return 0
+
+        updated_at = timezone.now()
+        to_update = []
+        stations = Station.objects.filter(wigos_id__in=list(self.metadata)) \
+            .only('wigos_id', 'name', 'geom', 'in_oscar', 'country_code', 'admin1_gid', 'admin1_name')
+
+        for station in stations:
+            latest = self.to_station(station.wigos_id)
+
+            if station.geom != latest.geom:
+                # moved, join it to its admin region again
+                station.admin1_gid = None
+                station.admin1_name = None
+            elif (station.name, station.in_oscar, station.country_code) == \
+                    (latest.name, latest.in_oscar, latest.country_code):
+                continue
+
+            station.name = latest.name
+            station.geom = latest.geom
+            station.in_oscar = latest.in_oscar
+            station.country_code = latest.country_code
+            station.updated_at = updated_at
+            to_update.append(station)
+
+        Station.objects.bulk_update(to_update, ['name', 'geom', 'in_oscar', 'country_code', 'admin1_gid', 'admin1_name',
+                                                'updated_at'], batch_size=500)
+
+        if to_update:
+            bump_data_version()
+            print(f"INGEST: Updated the metadata of {len(to_update)} station(s)")
+
+        return len(to_update)
+
+
+def write_transmissions(trans_rates):
+    """
+    Create new transmissions and update only the existing ones whose values changed.
+    Returns the number of created and updated rows
+    """
+    rows = {}
+    for _, row in trans_rates.iterrows():
+        received_date = datetime.strptime(row['date'], '%Y-%m-%d %H:%M:%S%z')
+        rows[(row['wigosid'], row['variable'], received_date)] = {
+            'received_rate': to_rate(row['received_rate']),
+            'received': to_count(row['#received']),
+            'expected': to_count(row['#expected']),
+        }
+
+    if not rows:
+        return 0, 0
+
+    # load the stored values for the whole batch in one query
+    stored = Transmission.objects.filter(
+        station_id__in={key[0] for key in rows},
+        variable__in={key[1] for key in rows},
+        received_date__in={key[2] for key in rows},
+    ).values_list('id', 'station_id', 'variable', 'received_date', 'received_rate', 'received', 'expected')
+
+    existing = {}
+    for pk, station_id, variable, received_date, received_rate, received, expected in stored:
+        existing[(station_id, variable, received_date)] = (pk, {
+            'received_rate': received_rate,
+            'received': received,
+            'expected': expected,
+        })
+
+    transmissions_to_create = []
+    transmissions_to_update = []
+    updated_at = timezone.now()
+    for key, data in rows.items():
+        if key in existing:
+            pk, stored_data = existing[key]
+            if stored_data != data:
+                transmissions_to_update.append(Transmission(id=pk, updated_at=updated_at, **data))
+        else:
+            station_id, variable, received_date = key
+            transmissions_to_create.append(Transmission(
+                station_id=station_id,
+                variable=variable,
+                received_date=received_date,
+                **data
+            ))
+
+    Transmission.objects.bulk_update(transmissions_to_update, ['received_rate', 'received', 'expected', 'updated_at'],
+                                     batch_size=500)
+    Transmission.objects.bulk_create(transmissions_to_create, ignore_conflicts=True)
+
+    return len(transmissions_to_create), len(transmissions_to_update)
+
+
+def write_center_transmissions(center_rates):
+    """
+    Replace the per center counts of the slice's transmissions. Returns the number of rows written
+    """
+    if center_rates.empty:
+        return 0
+
+    center_rates = center_rates.assign(
+        received_date=pd.to_datetime(center_rates['date'], format='%Y-%m-%d %H:%M:%S%z', utc=True)
+    )
+
+    # resolve the transmission ids in one query and join them to the rows
+    transmission_ids = pd.DataFrame(list(Transmission.objects.filter(
+        station_id__in=set(center_rates['wigosid']),
+        variable__in=set(center_rates['variable']),
+        received_date__in=set(center_rates['received_date'].dt.to_pydatetime()),
+    ).values_list('id', 'station_id', 'variable', 'received_date')),
+        columns=['transmission_id', 'wigosid', 'variable', 'received_date'])
+
+    if transmission_ids.empty:
+        return 0
+
+    transmission_ids['received_date'] = pd.to_datetime(transmission_ids['received_date'], utc=True) \
+        .astype(center_rates['received_date'].dtype)
+    rows = center_rates.merge(transmission_ids, on=['wigosid', 'variable', 'received_date'])
+
+    received = rows['#received'].astype(object).where(rows['#received'].notna(), None)
+    expected = rows['#expected'].astype(object).where(rows['#expected'].notna(), None)
+
+    center_transmissions = [
+        CenterTransmission(
+            transmission_id=int(transmission_id),
+            center=center,
+            received=None if row_received is None else int(row_received),
+            expected=None if row_expected is None else int(row_expected),
+        )
+        for transmission_id, center, row_received, row_expected
+        in zip(rows['transmission_id'], rows['center'], received, expected)
+    ]
+
+    CenterTransmission.objects.filter(transmission_id__in=transmission_ids['transmission_id'].tolist()).delete()
+    CenterTransmission.objects.bulk_create(center_transmissions, batch_size=1000)
+
+    return len(center_transmissions)
+
+
+def store_slice(trans_rates, date, period, variable, country_code, center_rates=None, stations=None):
+    """
+    Store a downloaded slice in write batches. An unchanged slice is skipped.
+    The station metadata is recorded on the run's StationSync, or applied right away without one.
+    Returns True if anything was written
+    """
+    batch_size = getattr(settings, "WDQMS_WRITE_BATCH_SIZE", DEFAULT_WRITE_BATCH_SIZE)
+
+    # unchanged slices still count towards the latest station metadata of the run
+    sync = stations if stations is not None else StationSync()
+    sync.add(trans_rates, date, period)
+
+    content_hash = hash_slice(trans_rates, center_rates)
+    slice_key = {'country_code': country_code, 'variable': variable, 'date': date, 'period': period}
+
+    if TransmissionSlice.objects.filter(**slice_key, content_hash=content_hash).exists():
+        print(f"INGEST: {date}-{period} unchanged since last ingestion, skipping")
+        if stations is None:
+            sync.apply()
+        return False
+
+    print(f"INGEST: Starting data ingestion for {date}-{period}")
+
+    created, updated = 0, 0
+
+    # only record the slice hash once its rows are stored
+    with transaction.atomic():
+        for batch in iter_batches(trans_rates, batch_size):
+            batch_created, batch_updated = write_transmissions(batch)
+            created += batch_created
+            updated += batch_updated
+        if center_rates is not None:
+            write_center_transmissions(center_rates)
+        TransmissionSlice.objects.update_or_create(**slice_key, defaults={'content_hash': content_hash})
+
+    bump_data_version()
+
+    if stations is None:
+        sync.apply()
+
+    print(f"INGEST: {created} created, {updated} updated")
+    print(f"INGEST: Completed ingestion for {date}-{period}")
+
+    return True
+
+
+def refresh_summaries(country_code, variable, months, station_ids):
+    # only the touched stations' rollups, the full rebuild is left to wdqms_rollups
+    refresh_rollups(variable, months, station_ids=station_ids)
+    refresh_region_rollups(country_code, variable, months)
+    refresh_station_summaries(station_ids, variable)
+    update_station_health(station_ids, variable)
+
+
+def ingest_slice(client, date, period, variable, centers, country_code, offline=False, per_center=None,
+                 stations=None):
+    """
+    Download and store a single (date, period, variable) slice for a country.
+    Safe to run repeatedly, an unchanged slice is skipped and rows are upserted.
+    The station metadata is left on stations for the caller to apply, or applied right away without one.
+    Returns False if the slice could not be retrieved from WDQMS
+    """
+    variable = variable.lower()
+
+    trans_rates, center_rates = download_transmission_rate_csv(client, date, period, variable, centers, BASELINE,
+                                                               country_code, offline=offline,
+                                                               per_center=get_per_center(per_center))
+
+    if trans_rates is None:
+        return False
+
+    if store_slice(trans_rates, date, period, variable, country_code, center_rates=center_rates, stations=stations):
+        refresh_summaries(country_code, variable, {datetime.strptime(date, "%Y-%m-%d").date().replace(day=1)},
+                          set(trans_rates['wigosid']))
+
+    return True
+
+
+def ingest_transmission_rates(start_date, end_date, variable, periods, centers, country_code, offline=False,
+                              client=None, per_center=None, stations=None):
+    ingest_slices(iter_slices(start_date, end_date, periods), variable, centers, country_code, offline=offline,
+                  client=client, per_center=per_center, stations=stations)
+
+
+def ingest_slices(slices, variable, centers, country_code, offline=False, client=None, per_center=None,
+                  stations=None):
+    """
+    Ingest the given (date, period) slices of a variable for a country.
+    The station metadata is recorded on the command's StationSync, applied by the command once all its ingests are
+    done, or diffed once for these slices without one
+    """
+    if client is None:
+        client = WDQMSClient()
+
+    print(f"INGEST: Ingesting {variable.upper()}...")
+    variable = variable.lower()
+
+    # slices -> filtered frames -> write batches, downloads overlap with db writes
+    frames = iter_frames(client, slices, variable, centers, country_code, offline=offline,
+                         per_center=get_per_center(per_center))
+
+    own_stations = stations is None
+    if own_stations:
+        stations = StationSync()
+
+    touched_months = set()
+    touched_stations = set()
+    for date, period, trans_rates, center_rates in prefetch(frames):
+        if store_slice(trans_rates, date, period, variable, country_code, center_rates=center_rates,
+                       stations=stations):
+            touched_months.add(datetime.strptime(date, "%Y-%m-%d").date().replace(day=1))
+            touched_stations.update(trans_rates['wigosid'])
+
+    if own_stations:
+        stations.apply()
+
+    # summaries once for the whole ingest
+    if touched_months:
+        print(f"INGEST: Updating summaries for {len(touched_months)} month(s) and {len(touched_stations)} station(s)")
+        refresh_summaries(country_code, variable, touched_months, touched_stations)
@@ -0,0 +1,72 @@
+import re
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+
+from climweb_wdqms.constants import VARIABLES
+from climweb_wdqms.models import Station
+
+# Stations whose summary cards are rebuilt together
+SUMMARY_BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the daily, monthly, yearly and synop hour transmission rollups, the country and admin region '
+            'rollups and the station summaries')
+
+    def add_arguments(self, parser):
+        parser.add_argument('-var', '--variable', type=str, help='Accepted variables are e.g pressure,temperature, humidity, meridional_wind, zonal_wind. Defaults to all')
+        parser.add_argument('-s', '--start_date', type=str, help='First month to rebuild. format YYYY-MM')
+        parser.add_argument('-e', '--end_date', type=str, help='Last month to rebuild. format YYYY-MM')
+        parser.add_argument('--chunk-size', type=int, help='Transmission rows loaded per chunk. Defaults to 50000')
+        parser.add_argument('--regions', action='store_true', help='Only rebuild the country and admin region rollups')
+
+    def handle(self, *args, **kwargs):
+        # pandas is only loaded when the command runs
+        from climweb_wdqms.regions import refresh_region_rollups, region_country_codes
+        from climweb_wdqms.rollups import DEFAULT_CHUNK_SIZE, refresh_rollups, stored_months
+        from climweb_wdqms.summaries import refresh_station_summaries
+
+        chunk_size = kwargs['chunk_size'] or DEFAULT_CHUNK_SIZE
+        variables = [kwargs['variable']] if kwargs['variable'] is not None else VARIABLES
+
+        for variable in variables:
+            if variable not in VARIABLES:
+                self.stderr.write(self.style.ERROR("Accepeted variables include pressure,temperature, humidity, meridional_wind, zonal_wind"))
+                return
+
+        month_pattern = re.compile(r'^\d{4}-\d{2}$')
+        for option in ('start_date', 'end_date'):
+            if kwargs[option] is not None and not month_pattern.match(kwargs[option]):
+                self.stderr.write(self.style.ERROR(f"Invalid format for '{option}'. Use YYYY-MM format."))
+                return
+
+        start = datetime.strptime(kwargs['start_date'], "%Y-%m").date() if kwargs['start_date'] else None
+        end = datetime.strptime(kwargs['end_date'], "%Y-%m").date() if kwargs['end_date'] else None
+
+        # also backfills the country of stations stored before it was recorded
+        country_codes = region_country_codes()
+
+        for variable in variables:
+            months = [month for month in stored_months(variable)
+                      if (start is None or month >= start) and (end is None or month <= end)]
+
+            if not kwargs['regions']:
+                self.stdout.write(f"ROLLUP: Rebuilding {len(months)} month(s) of {variable.upper()}")
+                refresh_rollups(variable, months, chunk_size=chunk_size)
+
+            self.stdout.write(f"ROLLUP: Rebuilding {variable.upper()} region rollups of {len(country_codes)} country(ies)")
+            for country_code in country_codes:
+                refresh_region_rollups(country_code, variable, months)
+
+        if kwargs['regions']:
+            self.stdout.write(self.style.SUCCESS("ROLLUP: Done"))
+            return
+
+        station_ids = list(Station.objects.values_list('wigos_id', flat=True))
+        for variable in variables:
+            self.stdout.write(f"ROLLUP: Rebuilding {variable.upper()} summaries of {len(station_ids)} station(s)")
+            for i in range(0, len(station_ids), SUMMARY_BATCH_SIZE):
+                refresh_station_summaries(station_ids[i:i + SUMMARY_BATCH_SIZE], variable)
+
+        self.stdout.write(self.style.SUCCESS("ROLLUP: Done"))
@@ -1,150 +1,16 @@
 import logging
-import csv
-import os
 import re
 from datetime import datetime, timedelta
-from django.contrib.gis.geos import Point
-import pandas as pd
-import numpy as np
 
-import requests
 from django.core.management.base import BaseCommand
-from climweb_wdqms.models import Station, Transmission
+from climweb_wdqms.models import Transmission
+from climweb_wdqms.planner import count_slices, plan_missing_slices
+from climweb_wdqms.regions import assign_countries
+from climweb_wdqms.tasks import enqueue_slice, enqueue_transmission_rates
 from adminboundarymanager.models import Country
 
 logger = logging.getLogger(__name__)
 
-# Define the base URL for the WDQMS csv download
-BASE_URL = "https://wdqms.wmo.int/wdqmsapi/v1/download/synop/six_hour/availability"
-
-# params---> "date=2024-05-01&period=18&variable=pressure&centers=DWD,ECMWF,JMA,NCEP&baseline=OSCAR"
-
-def download_transmission_rate_csv(date, period, variable, centers, baseline, country_code):
-
-    params = {
-        'date': date,
-        'period': period,
-        'variable': variable,
-        'centers': ','.join(centers),
-        'baseline': baseline
-    }
-    file_name = os.path.join("tmp",f"{date}_{period}_{variable}.csv")
-
-    print(f"DOWNLOAD: Starting download of {file_name}")
-
-
-    response = requests.get(BASE_URL, params=params)
-
-    # Check if the request was successful
-    if response.status_code == 200:
-
-        # Check if the directory already exists
-        if not os.path.exists("tmp"):
-            # Create the directory
-            os.makedirs("tmp")
-
-        with open(file_name, 'wb') as f:
-            f.write(response.content)
-
-        print(f"DOWNLOAD: {file_name} downloaded successfully.")
-        
-        # Load the CSV data into a DataFrame
-        df = pd.read_csv(file_name)
-       
-        df_filtered = df[df['country code'] == country_code]
-
-        # Assuming df_filtered is your DataFrame
-        df_filtered = df_filtered.copy()
-        df_filtered['received_rate'] = (df_filtered['#received'] / df_filtered['#expected']) * 100
-         # Group by 'name' and select the row with the highest 'received rate'
-        max_rate_indices = df_filtered.groupby('wigosid')['received_rate'].idxmax()
-        df_filtered = df_filtered.loc[max_rate_indices]
-        df_filtered.replace([np.inf, -np.inf], 0, inplace=True)
-
-        os.remove(file_name)
-        return df_filtered
-
-    else:
-        print("Failed to retrieve data. Status code:", response.status_code)
-
-def generate_date_range(start_date, end_date):
-    dates = []
-    current_date = datetime.strptime(start_date, "%Y-%m-%d")
-    while current_date <= datetime.strptime(end_date, "%Y-%m-%d"):
-        dates.append(current_date.strftime('%Y-%m-%d'))
-        current_date += timedelta(days=1)
-    return dates
-
-
-def ingest_transmission_rates(start_date, end_date, variable, periods, centers, country_code):
-    dates = generate_date_range(start_date, end_date)
-    baseline = "OSCAR"
-
-    print(f"INGEST: Ingesting {variable.upper()}...")
-    variable = variable.lower()
-
-    for date in dates:
-        for period in periods:
-            trans_rates = download_transmission_rate_csv(date, period, variable, centers, baseline, country_code)
-
-            print(f"INGEST: Starting data ingestion for {date}-{period}")
-
-            # Create or update stations
-            stations_to_create = []
-            for _, row in trans_rates.iterrows():
-                wigos_id = row['wigosid']
-                station_data = {
-                    'name': row['name'],
-                    'geom': Point(row['longitude'], row['latitude']),
-                    'in_oscar': row['in OSCAR']
-                }
-                
-                # Check if station exists
-                existing_station = Station.objects.filter(wigos_id=wigos_id).first()
-                if existing_station:
-                    # Update existing station if there are changes
-                    update_needed = False
-                    if (existing_station.name != station_data['name'] or 
-                        existing_station.geom != station_data['geom'] or 
-                        existing_station.in_oscar != station_data['in_oscar']):
-                        for key, value in station_data.items():
-                            setattr(existing_station, key, value)
-                        existing_station.save()
-                else:
-                    # Append new station data for bulk creation
-                    station_data['wigos_id'] = wigos_id
-                    stations_to_create.append(Station(**station_data))
-
-            # Bulk create new stations
-            Station.objects.bulk_create(stations_to_create, ignore_conflicts=True)
-
-            # Create or update transmissions
-            transmissions_to_create = []
-            for _, row in trans_rates.iterrows():
-                received_date = datetime.strptime(row['date'], '%Y-%m-%d %H:%M:%S%z')
-                if Transmission.objects.filter(station=row['wigosid'], variable=row['variable'], received_date=received_date).exists():
-                    transmission_data = {
-                        'received_rate': row['received_rate'],
-                        'received': row['#received'],
-                        'expected': row['#expected'],
-                    }
-                    Transmission.objects.filter(station=row['wigosid'], variable=row['variable'], received_date=received_date).update(**transmission_data)
-                else:
-                    station = Station.objects.get(wigos_id=row['wigosid'])
-                    transmissions_to_create.append(Transmission(
-                        station=station,
-                        variable=row['variable'],
-                        received_rate=row['received_rate'],
-                        received=row['#received'],
-                        expected=row['#expected'],
-                        received_date=received_date
-                    ))
-
-            # Bulk create new transmissions
-            Transmission.objects.bulk_create(transmissions_to_create, ignore_conflicts=True)
-
-            print(f"INGEST: Completed ingestion for {date}-{period}")
-
 
 class Command(BaseCommand):
     help = ('Fetch Country level transmission rate from WDQMS')
@@ -158,6 +24,11 @@ class Command(BaseCommand):
         parser.add_argument('-var', '--variable', type=str, help='Accepted variables are e.g pressure,temperature, humidity, meridional_wind, zonal_wind') 
         parser.add_argument('-p', '--periods', nargs='+', type=str, help='List of synoptic hours e.g 00, 06, 12, 18') 
         parser.add_argument('-c', '--centers', nargs='+', type=str, help='List of monitoring centers e.g DWD, ECMWF, JMA, NCEP') 
+        parser.add_argument('--offline', action='store_true', help='Ingest only from the local WDQMS response cache without any network requests') 
+        parser.add_argument('--per-center', action='store_true', help='Also store the counts of every monitoring center instead of only the best one') 
+        parser.add_argument('--enqueue', action='store_true', help='Queue the slices for background workers instead of ingesting them now') 
+        parser.add_argument('--fill-gaps', action='store_true', help='Only ingest the slices missing between the start and end date. Start date defaults to 2023-01-01') 
+        parser.add_argument('--dry-run', action='store_true', help='With --fill-gaps, print the missing slices without ingesting them') 
 
         # Arguments are not added here since they will be parsed manually
         return
@@ -182,9 +53,20 @@ class Command(BaseCommand):
         # Regular expression to match YYYY-MM-DD format
         date_pattern = re.compile(r'^\d{4}-\d{2}-\d{2}$')
 
-        if variable is not None:
+        # gaps are filled for all variables unless one is given
+        variables = [kwargs['variable']] if kwargs['variable'] is not None else variables_ls
+
+        if kwargs['dry_run'] and not kwargs['fill_gaps']:
+            self.stderr.write(self.style.ERROR("--dry-run is only supported with --fill-gaps"))
+            return  # Exit the command
+
+        if kwargs['fill_gaps']:
+            if kwargs['variable'] is not None and kwargs['variable'] not in variables_ls:
+                self.stderr.write(self.style.ERROR("Accepeted variables include pressure,temperature, humidity, meridional_wind, zonal_wind"))
+                return  # Exit the command
+        elif variable is not None:
             if variable not in variables_ls:
-                self.stderr.write(self.style.ERROR(f"Accepeted variables include pressure,temperature, humidity, meridional_wind, zonal_wind"))
+                self.stderr.write(self.style.ERROR("Accepeted variables include pressure,temperature, humidity, meridional_wind, zonal_wind"))
                 return  # Exit the command
             else:
                 # check latest date for variable
@@ -204,16 +86,16 @@ class Command(BaseCommand):
         # Parsing the arguments manually
         if start_date is not None:
             if not date_pattern.match(start_date):
-                self.stderr.write(self.style.ERROR(f"Invalid format for 'start_date'. Use YYYY-MM-DD format."))
+                self.stderr.write(self.style.ERROR("Invalid format for 'start_date'. Use YYYY-MM-DD format."))
                 return  # Exit the command
 
         if end_date is not None:  
             if not date_pattern.match(end_date):
-                self.stderr.write(self.style.ERROR(f"Invalid format for 'end_date'. Use YYYY-MM-DD format."))
+                self.stderr.write(self.style.ERROR("Invalid format for 'end_date'. Use YYYY-MM-DD format."))
                 return  # Exit the command
             
         if datetime.strptime(start_date, "%Y-%m-%d") > datetime.strptime(end_date, "%Y-%m-%d"):
-            self.stderr.write(self.style.ERROR(f"'End date' cannot come earlier than 'Start date'"))
+            self.stderr.write(self.style.ERROR("'End date' cannot come earlier than 'Start date'"))
             return  # Exit the command
 
 
@@ -233,25 +115,87 @@ class Command(BaseCommand):
             
 
         if start_date is not None and end_date is not None and variable is not None and centers is not None and periods is not None:
-            for country in Country.objects.all():
-                if Country.objects.count() > 0:
-                    # loop through all countries in boundary manager for data fetching and ingestion
-                    self.stdout.write(f"FETCH: Requesting data for {country.country.name}")
-
-                    ingest_transmission_rates(start_date, end_date, variable, periods, centers, country.country.alpha3)
-                else:
-                    self.stderr.write(self.style.ERROR(f"Please select atleast one country in admin boundary settings first"))
-
-
-        
-
-
-            
-
-        
-        
-
-
-
-
-        
\ No newline at end of file
+            if kwargs['fill_gaps']:
+                self.fill_gaps(start_date, end_date, variables, periods, centers, kwargs)
+                return
+
+            if kwargs['enqueue']:
+                country_codes = [country.country.alpha3 for country in Country.objects.all()]
+                if not country_codes:
+                    self.stderr.write(self.style.ERROR("Please select atleast one country in admin boundary settings first"))
+                    return
+
+                count = enqueue_transmission_rates(start_date, end_date, [variable], periods, centers, country_codes)
+                self.stdout.write(f"QUEUE: Enqueued {count} slices")
+                return
+
+            # the ingest dependencies (pandas, requests) are only loaded when actually ingesting
+            from climweb_wdqms.client import WDQMSClient
+            from climweb_wdqms.ingest import StationSync, ingest_transmission_rates
+
+            # station metadata is diffed once for the whole command, over every country
+            stations = StationSync()
+
+            # one pooled client for the whole run so all downloads share connections
+            with WDQMSClient() as client:
+                for country in Country.objects.all():
+                    if Country.objects.count() > 0:
+                        # loop through all countries in boundary manager for data fetching and ingestion
+                        self.stdout.write(f"FETCH: Requesting data for {country.country.name}")
+
+                        ingest_transmission_rates(start_date, end_date, variable, periods, centers,
+                                                  country.country.alpha3, offline=kwargs['offline'], client=client,
+                                                  per_center=kwargs['per_center'] or None, stations=stations)
+                    else:
+                        self.stderr.write(self.style.ERROR("Please select atleast one country in admin boundary settings first"))
+
+            stations.apply()
+
+
+    def fill_gaps(self, start_date, end_date, variables, periods, centers, options):
+        country_codes = [country.country.alpha3 for country in Country.objects.all()]
+        if not country_codes:
+            self.stderr.write(self.style.ERROR("Please select atleast one country in admin boundary settings first"))
+            return
+
+        if not options['dry_run']:
+            # older stations may not have their country yet. Skipped by the dry run, which only reads
+            assign_countries()
+
+        # the whole plan comes from a single query on the stored slices
+        plan = plan_missing_slices(start_date, end_date, variables, periods, country_codes)
+        self.stdout.write(f"PLAN: {count_slices(plan)} missing slices between {start_date} and {end_date}")
+
+        if options['dry_run']:
+            for country_code, variable_slices in plan.items():
+                for variable, slices in variable_slices.items():
+                    # one line per day with its missing periods
+                    date_periods = {}
+                    for date, period in slices:
+                        date_periods.setdefault(date, []).append(period)
+                    for date, missing_periods in date_periods.items():
+                        self.stdout.write(f"PLAN: {country_code} {variable} {date} {' '.join(missing_periods)}")
+            return
+
+        if options['enqueue']:
+            for country_code, variable_slices in plan.items():
+                for variable, slices in variable_slices.items():
+                    for date, period in slices:
+                        enqueue_slice(variable, date, period, centers, country_code)
+            self.stdout.write(f"QUEUE: Enqueued {count_slices(plan)} slices")
+            return
+
+        from climweb_wdqms.client import WDQMSClient
+        from climweb_wdqms.ingest import StationSync, ingest_slices
+
+        stations = StationSync()
+
+        with WDQMSClient() as client:
+            for country_code, variable_slices in plan.items():
+                self.stdout.write(f"FETCH: Filling {count_slices({country_code: variable_slices})} missing slices "
+                                  f"for {country_code}")
+                for variable, slices in variable_slices.items():
+                    ingest_slices(slices, variable, centers, country_code, offline=options['offline'], client=client,
+                                  per_center=options['per_center'] or None, stations=stations)
+
+        stations.apply()
@@ -0,0 +1,52 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from climweb_wdqms.tasks import claim_task, requeue_tasks, run_task, schedule_daily_ingest
+
+
+class Command(BaseCommand):
+    help = ('Run queued WDQMS ingestion tasks from the database backed queue')
+
+    def add_arguments(self, parser):
+        parser.add_argument('-w', '--workers', type=int, default=2, help='Number of slices ingested concurrently')
+        parser.add_argument('--poll-interval', type=int, default=10, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+        parser.add_argument('--no-schedule', action='store_true', help='Do not enqueue the daily incremental ingest')
+
+    def handle(self, *args, **kwargs):
+        # pandas is only loaded by the worker process, not when the command module is imported
+        from climweb_wdqms.ingest import StationSync
+
+        workers = kwargs['workers']
+
+        # station metadata of every task is diffed once each time the queue is drained
+        stations = StationSync()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                if not kwargs['no_schedule']:
+                    scheduled = schedule_daily_ingest()
+                    if scheduled:
+                        self.stdout.write(f"SCHEDULE: Enqueued {scheduled} slices for the daily ingest")
+
+                requeued = requeue_tasks()
+                if requeued:
+                    self.stdout.write(f"QUEUE: Requeued {requeued} failed or interrupted tasks")
+
+                futures = []
+                for _ in range(workers):
+                    task = claim_task()
+                    if task is None:
+                        break
+                    futures.append(executor.submit(run_task, task, stations))
+
+                for future in futures:
+                    future.result()
+
+                if not futures:
+                    stations.apply()
+                    if kwargs['once']:
+                        break
+                    time.sleep(kwargs['poll_interval'])
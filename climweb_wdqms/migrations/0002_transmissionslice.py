@@ -0,0 +1,30 @@
+# Generated by Django 4.2.11 on 2026-10-19 08:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('climweb_wdqms', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransmissionSlice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('country_code', models.CharField(max_length=3, verbose_name='Country code')),
+                ('variable', models.CharField(max_length=50, verbose_name='Transmission Variable')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('period', models.CharField(max_length=2, verbose_name='Synop period')),
+                ('content_hash', models.CharField(max_length=64, verbose_name='Content hash')),
+                ('ingested_at', models.DateTimeField(auto_now=True, verbose_name='Date Time Ingested')),
+            ],
+            options={
+                'verbose_name': 'Transmission Slice',
+                'verbose_name_plural': 'Transmission Slices',
+                'unique_together': {('country_code', 'variable', 'date', 'period')},
+            },
+        ),
+    ]
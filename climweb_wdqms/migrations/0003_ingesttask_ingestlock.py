@@ -0,0 +1,45 @@
+# Generated by Django 4.2.11 on 2026-10-19 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('climweb_wdqms', '0002_transmissionslice'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestLock',
+            fields=[
+                ('key', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='Key')),
+                ('acquired_at', models.DateTimeField(auto_now_add=True, verbose_name='Date Time Acquired')),
+            ],
+            options={
+                'verbose_name': 'Ingest Lock',
+                'verbose_name_plural': 'Ingest Locks',
+            },
+        ),
+        migrations.CreateModel(
+            name='IngestTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('country_code', models.CharField(max_length=3, verbose_name='Country code')),
+                ('variable', models.CharField(max_length=50, verbose_name='Transmission Variable')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('period', models.CharField(max_length=2, verbose_name='Synop period')),
+                ('centers', models.CharField(max_length=50, verbose_name='Monitoring centers')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='pending', max_length=10, verbose_name='Status')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Attempts')),
+                ('error', models.TextField(blank=True, null=True, verbose_name='Error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Date Time Created')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Date Time Updated')),
+            ],
+            options={
+                'verbose_name': 'Ingest Task',
+                'verbose_name_plural': 'Ingest Tasks',
+                'indexes': [models.Index(fields=['status', 'created_at'], name='climweb_wdq_status_6b5ef0_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.11 on 2026-10-19 14:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('climweb_wdqms', '0003_ingesttask_ingestlock'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StationHealth',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('variable', models.CharField(max_length=50, verbose_name='Transmission Variable')),
+                ('ewma_received_rate', models.FloatField(verbose_name='Smoothed Transmission Rate')),
+                ('consecutive_zero_periods', models.PositiveIntegerField(default=0, verbose_name='Consecutive periods without transmissions')),
+                ('last_received_rate', models.FloatField(verbose_name='Last Transmission Rate')),
+                ('last_received_date', models.DateTimeField(verbose_name='Last Date Time Received')),
+                ('status', models.CharField(choices=[('ok', 'OK'), ('degraded', 'Degraded'), ('silent', 'Silent')], default='ok', max_length=10, verbose_name='Status')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Date Time Updated')),
+                ('station', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='health', to='climweb_wdqms.station')),
+            ],
+            options={
+                'verbose_name': 'Station Health',
+                'verbose_name_plural': 'Station Health',
+                'indexes': [models.Index(fields=['variable', 'status'], name='climweb_wdq_variabl_72d90d_idx')],
+                'unique_together': {('station', 'variable')},
+            },
+        ),
+    ]
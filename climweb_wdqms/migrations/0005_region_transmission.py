@@ -0,0 +1,51 @@
+# Generated by Django 4.2.11 on 2026-10-19 14:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('climweb_wdqms', '0004_stationhealth'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='station',
+            name='admin1_gid',
+            field=models.CharField(blank=True, db_index=True, max_length=100, null=True, verbose_name='Admin level 1 ID'),
+        ),
+        migrations.AddField(
+            model_name='station',
+            name='admin1_name',
+            field=models.CharField(blank=True, max_length=100, null=True, verbose_name='Admin level 1 name'),
+        ),
+        migrations.AddField(
+            model_name='station',
+            name='country_code',
+            field=models.CharField(blank=True, db_index=True, max_length=3, null=True, verbose_name='Country code'),
+        ),
+        migrations.CreateModel(
+            name='RegionTransmission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('country_code', models.CharField(max_length=3, verbose_name='Country code')),
+                ('level', models.PositiveSmallIntegerField(choices=[(0, 'Country'), (1, 'Admin level 1')], verbose_name='Level')),
+                ('gid', models.CharField(max_length=100, verbose_name='Region ID')),
+                ('name', models.CharField(max_length=255, verbose_name='Region name')),
+                ('variable', models.CharField(max_length=50, verbose_name='Transmission Variable')),
+                ('month', models.DateField(verbose_name='Month')),
+                ('avg_received_rate', models.FloatField(null=True, verbose_name='Average Transmission Rate')),
+                ('avg_received', models.FloatField(null=True, verbose_name='Average Transmissions received')),
+                ('avg_expected', models.FloatField(null=True, verbose_name='Average Transmissions expected')),
+                ('station_count', models.PositiveIntegerField(default=0, verbose_name='Stations')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Date Time Updated')),
+            ],
+            options={
+                'verbose_name': 'Region Transmission',
+                'verbose_name_plural': 'Region Transmissions',
+                'indexes': [models.Index(fields=['variable', 'level', 'month'], name='climweb_wdq_variabl_edb8ee_idx')],
+                'unique_together': {('level', 'gid', 'variable', 'month')},
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.11 on 2026-10-19 14:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('climweb_wdqms', '0005_region_transmission'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransmissionRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('variable', models.CharField(max_length=50, verbose_name='Transmission Variable')),
+                ('frequency', models.CharField(choices=[('daily', 'Daily'), ('monthly', 'Monthly'), ('yearly', 'Yearly'), ('monthly_synop', 'Monthly per synop hour')], max_length=20, verbose_name='Frequency')),
+                ('period_start', models.DateField(verbose_name='Period start')),
+                ('synop_hour', models.PositiveSmallIntegerField(null=True, verbose_name='Synop hour')),
+                ('count', models.PositiveIntegerField(verbose_name='Transmission rows')),
+                ('received_rate_sum', models.FloatField(verbose_name='Sum of Transmission Rates')),
+                ('received_sum', models.BigIntegerField(verbose_name='Sum of Transmissions received')),
+                ('received_count', models.PositiveIntegerField(verbose_name='Rows with Transmissions received')),
+                ('expected_sum', models.BigIntegerField(verbose_name='Sum of Transmissions expected')),
+                ('expected_count', models.PositiveIntegerField(verbose_name='Rows with Transmissions expected')),
+                ('station', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='climweb_wdqms.station')),
+            ],
+            options={
+                'verbose_name': 'Transmission Rollup',
+                'verbose_name_plural': 'Transmission Rollups',
+                'indexes': [models.Index(fields=['variable', 'frequency', 'period_start'], name='climweb_wdq_variabl_517054_idx'), models.Index(fields=['station', 'variable', 'frequency', 'period_start'], name='climweb_wdq_station_ee86de_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,140 @@
+# Generated by Django 4.2.11 on 2026-10-19 14:08
+
+import climweb_wdqms.fields
+from django.db import migrations, models
+
+VARIABLE_CODES = {
+    'pressure': 1,
+    'temperature': 2,
+    'humidity': 3,
+    'meridional_wind': 4,
+    'zonal_wind': 5,
+}
+
+
+def variable_code(name):
+    # older ingests stored the names as typed on the command line, e.g Pressure or meridional wind
+    return VARIABLE_CODES.get(name.strip().lower().replace(' ', '_').replace('-', '_'))
+
+
+def variable_names_to_codes(apps, schema_editor):
+    names_by_model = {}
+    for model_name in ('Transmission', 'TransmissionRollup'):
+        model = apps.get_model('climweb_wdqms', model_name)
+        names_by_model[model] = set(model.objects.exclude(variable=None).values_list('variable', flat=True).distinct()
+                                    .order_by())
+
+    # check every name before changing any row, the variable column becomes not null
+    unknown = sorted({name for names in names_by_model.values() for name in names if variable_code(name) is None})
+    if unknown:
+        raise ValueError(f"Unknown transmission variables {unknown}. Rename or delete these rows, "
+                         f"the known variables are {list(VARIABLE_CODES)}")
+
+    for model, names in names_by_model.items():
+        for name in names:
+            model.objects.filter(variable=name).update(variable_code=variable_code(name))
+
+
+def variable_codes_to_names(apps, schema_editor):
+    for model_name in ('Transmission', 'TransmissionRollup'):
+        model = apps.get_model('climweb_wdqms', model_name)
+        for name, code in VARIABLE_CODES.items():
+            model.objects.filter(variable_code=code).update(variable=name)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('climweb_wdqms', '0006_transmissionrollup'),
+    ]
+
+    operations = [
+        # indexes on the replaced column are dropped with it, recreate them afterwards
+        migrations.RemoveIndex(
+            model_name='transmissionrollup',
+            name='climweb_wdq_variabl_517054_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='transmissionrollup',
+            name='climweb_wdq_station_ee86de_idx',
+        ),
+        # variable name -> small integer code
+        migrations.AddField(
+            model_name='transmission',
+            name='variable_code',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='transmissionrollup',
+            name='variable_code',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='transmission',
+            name='variable',
+            field=models.CharField(max_length=50, null=True, verbose_name='Transmission Variable'),
+        ),
+        migrations.AlterField(
+            model_name='transmissionrollup',
+            name='variable',
+            field=models.CharField(max_length=50, null=True, verbose_name='Transmission Variable'),
+        ),
+        migrations.RunPython(variable_names_to_codes, variable_codes_to_names),
+        migrations.RemoveField(
+            model_name='transmission',
+            name='variable',
+        ),
+        migrations.RemoveField(
+            model_name='transmissionrollup',
+            name='variable',
+        ),
+        migrations.RenameField(
+            model_name='transmission',
+            old_name='variable_code',
+            new_name='variable',
+        ),
+        migrations.RenameField(
+            model_name='transmissionrollup',
+            old_name='variable_code',
+            new_name='variable',
+        ),
+        migrations.AlterField(
+            model_name='transmission',
+            name='variable',
+            field=climweb_wdqms.fields.VariableField(verbose_name='Transmission Variable'),
+        ),
+        migrations.AlterField(
+            model_name='transmissionrollup',
+            name='variable',
+            field=climweb_wdqms.fields.VariableField(verbose_name='Transmission Variable'),
+        ),
+        migrations.AddIndex(
+            model_name='transmissionrollup',
+            index=models.Index(fields=['variable', 'frequency', 'period_start'], name='climweb_wdq_variabl_517054_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transmissionrollup',
+            index=models.Index(fields=['station', 'variable', 'frequency', 'period_start'], name='climweb_wdq_station_ee86de_idx'),
+        ),
+        # counts fit in a smallint, the rate is a float and the id a plain integer
+        migrations.AlterField(
+            model_name='transmission',
+            name='received',
+            field=models.PositiveSmallIntegerField(null=True, verbose_name='Transmissions received'),
+        ),
+        migrations.AlterField(
+            model_name='transmission',
+            name='expected',
+            field=models.PositiveSmallIntegerField(null=True, verbose_name='Transmissions expected'),
+        ),
+        migrations.AlterField(
+            model_name='transmission',
+            name='received_rate',
+            field=models.FloatField(verbose_name='Transmission Rate'),
+        ),
+        migrations.AlterField(
+            model_name='transmission',
+            name='id',
+            field=models.AutoField(primary_key=True, serialize=False),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.11 on 2026-10-19 14:10
+
+import climweb_wdqms.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('climweb_wdqms', '0007_compact_transmission'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CenterTransmission',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('center', climweb_wdqms.fields.CenterField(verbose_name='Monitoring center')),
+                ('received', models.PositiveSmallIntegerField(null=True, verbose_name='Transmissions received')),
+                ('expected', models.PositiveSmallIntegerField(null=True, verbose_name='Transmissions expected')),
+                ('transmission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='centers', to='climweb_wdqms.transmission')),
+            ],
+            options={
+                'verbose_name': 'Center Transmission',
+                'verbose_name_plural': 'Center Transmissions',
+                'unique_together': {('transmission', 'center')},
+            },
+        ),
+    ]
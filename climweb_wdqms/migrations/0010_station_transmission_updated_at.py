@@ -0,0 +1,31 @@
+# Generated by Django 4.2.11 on 2026-10-19 14:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('climweb_wdqms', '0009_dataversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='station',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Date Time Updated'),
+        ),
+        migrations.AddField(
+            model_name='transmission',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Date Time Updated'),
+        ),
+        migrations.AddIndex(
+            model_name='station',
+            index=models.Index(fields=['updated_at', 'wigos_id'], name='climweb_wdq_updated_6fe495_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transmission',
+            index=models.Index(fields=['updated_at', 'id'], name='climweb_wdq_updated_c886b8_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.11 on 2026-10-19 14:17
+
+import climweb_wdqms.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('climweb_wdqms', '0010_station_transmission_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StationSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('variable', climweb_wdqms.fields.VariableField(verbose_name='Transmission Variable')),
+                ('latest_received_rate', models.FloatField(verbose_name='Latest Transmission Rate')),
+                ('latest_received_date', models.DateTimeField(verbose_name='Latest Date Time Received')),
+                ('avg_received_rate', models.FloatField(verbose_name='30 day Average Transmission Rate')),
+                ('trend', models.FloatField(null=True, verbose_name='Transmission Rate Trend')),
+                ('best_synop_hour', models.PositiveSmallIntegerField(verbose_name='Best Synop hour')),
+                ('best_synop_received_rate', models.FloatField(verbose_name='Best Synop hour Transmission Rate')),
+                ('worst_synop_hour', models.PositiveSmallIntegerField(verbose_name='Worst Synop hour')),
+                ('worst_synop_received_rate', models.FloatField(verbose_name='Worst Synop hour Transmission Rate')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Date Time Updated')),
+                ('station', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='summaries', to='climweb_wdqms.station')),
+            ],
+            options={
+                'verbose_name': 'Station Summary',
+                'verbose_name_plural': 'Station Summaries',
+                'unique_together': {('station', 'variable')},
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.11 on 2026-10-19 14:20
+
+from django.db import migrations, models
+
+
+def create_name_trigram_index(apps, schema_editor):
+    # trigram index for case insensitive substring search on the name, i.e name__icontains.
+    # pg_trgm only exists on PostgreSQL, other databases search the names without it
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute('CREATE INDEX IF NOT EXISTS wdqms_station_name_trgm '
+                          'ON climweb_wdqms_station USING gin (UPPER(name) gin_trgm_ops)')
+
+
+def drop_name_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS wdqms_station_name_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('climweb_wdqms', '0011_stationsummary'),
+    ]
+
+    operations = [
+        # not part of the model state, so that no other backend ever tries to build it
+        migrations.RunPython(create_name_trigram_index, drop_name_trigram_index),
+        migrations.AddIndex(
+            model_name='transmission',
+            index=models.Index(fields=['received_date', 'id'], name='climweb_wdq_receive_f2568e_idx'),
+        ),
+    ]
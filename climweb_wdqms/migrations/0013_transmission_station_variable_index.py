@@ -0,0 +1,17 @@
+# Generated by Django 4.2.11 on 2026-10-19 14:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('climweb_wdqms', '0012_admin_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transmission',
+            index=models.Index(fields=['station', 'variable', 'received_date'], name='climweb_wdq_station_4dfbec_idx'),
+        ),
+    ]
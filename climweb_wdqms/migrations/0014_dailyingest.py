@@ -0,0 +1,25 @@
+# Generated by Django 4.2.11 on 2026-10-19 14:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('climweb_wdqms', '0013_transmission_station_variable_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyIngest',
+            fields=[
+                ('date', models.DateField(primary_key=True, serialize=False, verbose_name='Date')),
+                ('slices', models.PositiveIntegerField(default=0, verbose_name='Enqueued slices')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Date Time Created')),
+            ],
+            options={
+                'verbose_name': 'Daily Ingest',
+                'verbose_name_plural': 'Daily Ingests',
+            },
+        ),
+    ]
@@ -3,16 +3,28 @@ from django.utils.translation import gettext_lazy as _
 from django.urls import reverse
 from django.utils.functional import cached_property
 
+from climweb_wdqms.fields import CenterField, VariableField
+
 class Station(models.Model):
 
     wigos_id = models.CharField(_("Wigos ID"), max_length=50, primary_key=True)
     name = models.CharField(_("Station name"), max_length=255)
     geom = models.PointField(_("Geometry"),)
     in_oscar = models.BooleanField(_("In Oscar?"),)
+    country_code = models.CharField(_("Country code"), max_length=3, blank=True, null=True, db_index=True)
+    # cached result of the spatial join to the level 1 admin boundaries. null until joined, empty if outside all
+    admin1_gid = models.CharField(_("Admin level 1 ID"), max_length=100, blank=True, null=True, db_index=True)
+    admin1_name = models.CharField(_("Admin level 1 name"), max_length=100, blank=True, null=True)
+    # set by ingest on bulk updates too, which skip auto_now
+    updated_at = models.DateTimeField(_("Date Time Updated"), auto_now=True)
 
     class Meta:
         verbose_name = _("Station")
         verbose_name_plural = _("Stations")
+        indexes = [
+            models.Index(fields=['updated_at', 'wigos_id']),
+        ]
+        # the name trigram index is created on PostgreSQL only, by migration 0012
 
     def __str__(self):
         return f'{self.name}-{self.wigos_id}'
@@ -25,19 +37,286 @@ class Station(models.Model):
 # Create your models here.
 class Transmission(models.Model):
 
+    id = models.AutoField(primary_key=True)
     station = models.ForeignKey("Station", on_delete=models.CASCADE)
-    variable = models.CharField(_("Transmission Variable"), max_length=50 )
-    received = models.IntegerField(_("Transmissions received"), null=True)
-    expected = models.IntegerField(_("Transmissions expected"), null=True)
-    received_rate = models.DecimalField(_("Transmission Rate"), max_digits=5, decimal_places=2)
+    variable = VariableField(_("Transmission Variable"))
+    received = models.PositiveSmallIntegerField(_("Transmissions received"), null=True)
+    expected = models.PositiveSmallIntegerField(_("Transmissions expected"), null=True)
+    received_rate = models.FloatField(_("Transmission Rate"))
     received_date = models.DateTimeField(_("Date Time Received"), auto_now=False, auto_now_add=False)
+    # set by ingest on bulk updates too, which skip auto_now
+    updated_at = models.DateTimeField(_("Date Time Updated"), auto_now=True)
 
     class Meta:
         verbose_name = _("Transmission")
         verbose_name_plural = _("Transmissions")
+        indexes = [
+            models.Index(fields=['updated_at', 'id']),
+            models.Index(fields=['received_date', 'id']),
+            # latest transmissions of a station, for the summaries and the health
+            models.Index(fields=['station', 'variable', 'received_date']),
+        ]
 
     def __str__(self):
         return f'{self.station} - {self.variable} - {self.received_date}'
     
 
 
+
+class TransmissionSlice(models.Model):
+
+    country_code = models.CharField(_("Country code"), max_length=3)
+    variable = models.CharField(_("Transmission Variable"), max_length=50)
+    date = models.DateField(_("Date"))
+    period = models.CharField(_("Synop period"), max_length=2)
+    content_hash = models.CharField(_("Content hash"), max_length=64)
+    ingested_at = models.DateTimeField(_("Date Time Ingested"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Transmission Slice")
+        verbose_name_plural = _("Transmission Slices")
+        unique_together = ('country_code', 'variable', 'date', 'period')
+
+    def __str__(self):
+        return f'{self.country_code} - {self.variable} - {self.date} {self.period}'
+
+
+class IngestTask(models.Model):
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = (
+        (STATUS_PENDING, _("Pending")),
+        (STATUS_RUNNING, _("Running")),
+        (STATUS_DONE, _("Done")),
+        (STATUS_FAILED, _("Failed")),
+    )
+
+    country_code = models.CharField(_("Country code"), max_length=3)
+    variable = models.CharField(_("Transmission Variable"), max_length=50)
+    date = models.DateField(_("Date"))
+    period = models.CharField(_("Synop period"), max_length=2)
+    centers = models.CharField(_("Monitoring centers"), max_length=50)
+    status = models.CharField(_("Status"), max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(_("Attempts"), default=0)
+    error = models.TextField(_("Error"), blank=True, null=True)
+    created_at = models.DateTimeField(_("Date Time Created"), auto_now_add=True)
+    updated_at = models.DateTimeField(_("Date Time Updated"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Ingest Task")
+        verbose_name_plural = _("Ingest Tasks")
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.country_code} - {self.variable} - {self.date} {self.period} ({self.status})'
+
+
+class IngestLock(models.Model):
+
+    key = models.CharField(_("Key"), max_length=100, primary_key=True)
+    acquired_at = models.DateTimeField(_("Date Time Acquired"), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Ingest Lock")
+        verbose_name_plural = _("Ingest Locks")
+
+    def __str__(self):
+        return self.key
+
+
+class DailyIngest(models.Model):
+    """
+    Marks a day already enqueued by the daily schedule of the database worker
+    """
+
+    date = models.DateField(_("Date"), primary_key=True)
+    slices = models.PositiveIntegerField(_("Enqueued slices"), default=0)
+    created_at = models.DateTimeField(_("Date Time Created"), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Daily Ingest")
+        verbose_name_plural = _("Daily Ingests")
+
+    def __str__(self):
+        return f"{self.date}"
+
+
+class StationHealth(models.Model):
+
+    STATUS_OK = 'ok'
+    STATUS_DEGRADED = 'degraded'
+    STATUS_SILENT = 'silent'
+
+    STATUS_CHOICES = (
+        (STATUS_OK, _("OK")),
+        (STATUS_DEGRADED, _("Degraded")),
+        (STATUS_SILENT, _("Silent")),
+    )
+
+    station = models.ForeignKey("Station", on_delete=models.CASCADE, related_name="health")
+    variable = models.CharField(_("Transmission Variable"), max_length=50)
+    ewma_received_rate = models.FloatField(_("Smoothed Transmission Rate"))
+    consecutive_zero_periods = models.PositiveIntegerField(_("Consecutive periods without transmissions"), default=0)
+    last_received_rate = models.FloatField(_("Last Transmission Rate"))
+    last_received_date = models.DateTimeField(_("Last Date Time Received"))
+    status = models.CharField(_("Status"), max_length=10, choices=STATUS_CHOICES, default=STATUS_OK)
+    updated_at = models.DateTimeField(_("Date Time Updated"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Station Health")
+        verbose_name_plural = _("Station Health")
+        unique_together = ('station', 'variable')
+        indexes = [
+            models.Index(fields=['variable', 'status']),
+        ]
+
+    def __str__(self):
+        return f'{self.station_id} - {self.variable} - {self.status}'
+
+
+class StationSummary(models.Model):
+
+    station = models.ForeignKey("Station", on_delete=models.CASCADE, related_name="summaries")
+    variable = VariableField(_("Transmission Variable"))
+    latest_received_rate = models.FloatField(_("Latest Transmission Rate"))
+    latest_received_date = models.DateTimeField(_("Latest Date Time Received"))
+    avg_received_rate = models.FloatField(_("30 day Average Transmission Rate"))
+    # change of the 30 day average against the 30 days before, null without earlier data
+    trend = models.FloatField(_("Transmission Rate Trend"), null=True)
+    best_synop_hour = models.PositiveSmallIntegerField(_("Best Synop hour"))
+    best_synop_received_rate = models.FloatField(_("Best Synop hour Transmission Rate"))
+    worst_synop_hour = models.PositiveSmallIntegerField(_("Worst Synop hour"))
+    worst_synop_received_rate = models.FloatField(_("Worst Synop hour Transmission Rate"))
+    updated_at = models.DateTimeField(_("Date Time Updated"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Station Summary")
+        verbose_name_plural = _("Station Summaries")
+        unique_together = ('station', 'variable')
+
+    def __str__(self):
+        return f'{self.station_id} - {self.variable}'
+
+
+class RegionTransmission(models.Model):
+
+    LEVEL_COUNTRY = 0
+    LEVEL_ADMIN1 = 1
+
+    LEVEL_CHOICES = (
+        (LEVEL_COUNTRY, _("Country")),
+        (LEVEL_ADMIN1, _("Admin level 1")),
+    )
+
+    country_code = models.CharField(_("Country code"), max_length=3)
+    level = models.PositiveSmallIntegerField(_("Level"), choices=LEVEL_CHOICES)
+    gid = models.CharField(_("Region ID"), max_length=100)
+    name = models.CharField(_("Region name"), max_length=255)
+    variable = models.CharField(_("Transmission Variable"), max_length=50)
+    month = models.DateField(_("Month"))
+    avg_received_rate = models.FloatField(_("Average Transmission Rate"), null=True)
+    avg_received = models.FloatField(_("Average Transmissions received"), null=True)
+    avg_expected = models.FloatField(_("Average Transmissions expected"), null=True)
+    station_count = models.PositiveIntegerField(_("Stations"), default=0)
+    updated_at = models.DateTimeField(_("Date Time Updated"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Region Transmission")
+        verbose_name_plural = _("Region Transmissions")
+        unique_together = ('level', 'gid', 'variable', 'month')
+        indexes = [
+            models.Index(fields=['variable', 'level', 'month']),
+        ]
+
+    def __str__(self):
+        return f'{self.name} - {self.variable} - {self.month}'
+
+
+class TransmissionRollup(models.Model):
+
+    FREQUENCY_DAILY = 'daily'
+    FREQUENCY_MONTHLY = 'monthly'
+    FREQUENCY_YEARLY = 'yearly'
+    FREQUENCY_SYNOP = 'monthly_synop'
+
+    FREQUENCY_CHOICES = (
+        (FREQUENCY_DAILY, _("Daily")),
+        (FREQUENCY_MONTHLY, _("Monthly")),
+        (FREQUENCY_YEARLY, _("Yearly")),
+        (FREQUENCY_SYNOP, _("Monthly per synop hour")),
+    )
+
+    station = models.ForeignKey("Station", on_delete=models.CASCADE)
+    variable = VariableField(_("Transmission Variable"))
+    frequency = models.CharField(_("Frequency"), max_length=20, choices=FREQUENCY_CHOICES)
+    period_start = models.DateField(_("Period start"))
+    synop_hour = models.PositiveSmallIntegerField(_("Synop hour"), null=True)
+    count = models.PositiveIntegerField(_("Transmission rows"))
+    received_rate_sum = models.FloatField(_("Sum of Transmission Rates"))
+    received_sum = models.BigIntegerField(_("Sum of Transmissions received"))
+    received_count = models.PositiveIntegerField(_("Rows with Transmissions received"))
+    expected_sum = models.BigIntegerField(_("Sum of Transmissions expected"))
+    expected_count = models.PositiveIntegerField(_("Rows with Transmissions expected"))
+
+    class Meta:
+        verbose_name = _("Transmission Rollup")
+        verbose_name_plural = _("Transmission Rollups")
+        indexes = [
+            models.Index(fields=['variable', 'frequency', 'period_start']),
+            models.Index(fields=['station', 'variable', 'frequency', 'period_start']),
+        ]
+
+    def __str__(self):
+        return f'{self.station_id} - {self.variable} - {self.frequency} {self.period_start}'
+
+    @property
+    def avg_received_rate(self):
+        return self.received_rate_sum / self.count if self.count else None
+
+    @property
+    def avg_received(self):
+        return self.received_sum / self.received_count if self.received_count else None
+
+    @property
+    def avg_expected(self):
+        return self.expected_sum / self.expected_count if self.expected_count else None
+
+
+class CenterTransmission(models.Model):
+
+    id = models.AutoField(primary_key=True)
+    transmission = models.ForeignKey("Transmission", on_delete=models.CASCADE, related_name="centers")
+    center = CenterField(_("Monitoring center"))
+    received = models.PositiveSmallIntegerField(_("Transmissions received"), null=True)
+    expected = models.PositiveSmallIntegerField(_("Transmissions expected"), null=True)
+
+    class Meta:
+        verbose_name = _("Center Transmission")
+        verbose_name_plural = _("Center Transmissions")
+        unique_together = ('transmission', 'center')
+
+    def __str__(self):
+        return f'{self.transmission_id} - {self.center}'
+
+
+class DataVersion(models.Model):
+    """
+    Single row counter bumped by every ingest write. A read replica that has replayed
+    the latest version has all the data written so far
+    """
+
+    version = models.PositiveBigIntegerField(_("Version"), default=0)
+    updated_at = models.DateTimeField(_("Date Time Updated"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Data Version")
+        verbose_name_plural = _("Data Version")
+
+    def __str__(self):
+        return str(self.version)
@@ -0,0 +1,68 @@
+from datetime import datetime, time, timedelta, timezone
+
+from django.db.models.functions import ExtractHour, TruncDate
+
+from climweb_wdqms.models import Transmission, TransmissionSlice
+
+
+def stored_slices(start_date, end_date, variables, periods, country_codes):
+    """
+    Keys of the slices already stored in the range. Slices are recorded since their content is hashed, so the
+    history ingested before that is read from the transmissions, in one grouped query. Only stations with a
+    country are matched, see assign_countries
+    """
+    stored = set(TransmissionSlice.objects.filter(
+        country_code__in=country_codes,
+        variable__in=variables,
+        period__in=periods,
+        date__gte=start_date,
+        date__lte=end_date,
+    ).values_list('country_code', 'date', 'period', 'variable').order_by())
+
+    transmissions = Transmission.objects.filter(
+        station__country_code__in=country_codes,
+        variable__in=variables,
+        received_date__gte=datetime.combine(start_date, time.min, tzinfo=timezone.utc),
+        received_date__lt=datetime.combine(end_date + timedelta(days=1), time.min, tzinfo=timezone.utc),
+    ).annotate(
+        day=TruncDate('received_date', tzinfo=timezone.utc),
+        hour=ExtractHour('received_date', tzinfo=timezone.utc),
+    ).values_list('station__country_code', 'day', 'hour', 'variable').distinct().order_by()
+
+    for country_code, day, hour, variable in transmissions:
+        period = str(hour).zfill(2)
+        if period in periods:
+            stored.add((country_code, day, period, variable))
+
+    return stored
+
+
+def plan_missing_slices(start_date, end_date, variables, periods, country_codes):
+    """
+    The slices of each country that were never stored, i.e failed downloads or periods skipped with --periods.
+    Returns {country_code: {variable: [(date, period), ...]}}, only with the countries and variables that have gaps
+    """
+    start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
+    end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
+
+    stored = stored_slices(start_date, end_date, variables, periods, country_codes)
+
+    plan = {}
+    for country_code in country_codes:
+        for variable in variables:
+            missing = []
+            date = start_date
+            while date <= end_date:
+                for period in periods:
+                    if (country_code, date, period, variable) not in stored:
+                        missing.append((date.strftime("%Y-%m-%d"), period))
+                date += timedelta(days=1)
+
+            if missing:
+                plan.setdefault(country_code, {})[variable] = missing
+
+    return plan
+
+
+def count_slices(plan):
+    return sum(len(slices) for variables in plan.values() for slices in variables.values())
@@ -0,0 +1,134 @@
+from datetime import datetime, timezone
+
+from django.db.models import Avg, Count, OuterRef, Subquery
+from django.utils import timezone as django_timezone
+
+from climweb_wdqms.models import RegionTransmission, Station, Transmission
+
+
+def assign_countries():
+    """
+    Backfill the country of stations stored before it was read from the WDQMS csv, from the level 0 boundary
+    that contains them. Stations outside all boundaries get an empty country code, so they are not looked up again
+    """
+    from adminboundarymanager.models import AdminBoundary
+
+    boundaries = AdminBoundary.objects.filter(level=0, geom__contains=OuterRef('geom'))
+    stations = Station.objects.filter(country_code__isnull=True).only('wigos_id').annotate(
+        boundary_gid=Subquery(boundaries.values('gid_0')[:1]),
+    )
+
+    to_update = []
+    updated_at = django_timezone.now()
+    for station in stations:
+        station.country_code = station.boundary_gid or ''
+        station.updated_at = updated_at
+        to_update.append(station)
+
+    Station.objects.bulk_update(to_update, ['country_code', 'updated_at'], batch_size=500)
+
+
+def region_country_codes():
+    """
+    Countries of the stored stations, once every station has one
+    """
+    assign_countries()
+    return list(Station.objects.exclude(country_code__isnull=True).exclude(country_code='')
+                .values_list('country_code', flat=True).distinct().order_by('country_code'))
+
+
+def assign_admin_regions():
+    """
+    Cache on each station the level 1 admin boundary that contains it.
+    Only stations not joined yet, i.e new or moved, are looked up, in a single query
+    """
+    from adminboundarymanager.models import AdminBoundary
+
+    boundaries = AdminBoundary.objects.filter(level=1, geom__contains=OuterRef('geom'))
+    stations = Station.objects.filter(admin1_gid__isnull=True).only('wigos_id').annotate(
+        boundary_gid=Subquery(boundaries.values('gid_1')[:1]),
+        boundary_name=Subquery(boundaries.values('name_1')[:1]),
+    )
+
+    to_update = []
+    updated_at = django_timezone.now()
+    for station in stations:
+        station.admin1_gid = station.boundary_gid or ''
+        station.admin1_name = station.boundary_name or ''
+        station.updated_at = updated_at
+        to_update.append(station)
+
+    Station.objects.bulk_update(to_update, ['admin1_gid', 'admin1_name', 'updated_at'], batch_size=500)
+
+
+def get_country_name(country_code):
+    from adminboundarymanager.models import AdminBoundary
+
+    name = AdminBoundary.objects.filter(level=0, gid_0=country_code).values_list('name_0', flat=True).first()
+    return name or country_code
+
+
+def month_range(month):
+    start = month.replace(day=1)
+    if start.month == 12:
+        end = start.replace(year=start.year + 1, month=1)
+    else:
+        end = start.replace(month=start.month + 1)
+    return start, end
+
+
+def refresh_region_rollups(country_code, variable, months):
+    """
+    Recompute the country and admin level 1 monthly averages for the given months,
+    e.g the months touched by an ingest
+    """
+    assign_countries()
+    assign_admin_regions()
+
+    country_name = get_country_name(country_code)
+
+    for month in sorted(months):
+        start, end = month_range(month)
+        start_datetime = datetime(start.year, start.month, start.day, tzinfo=timezone.utc)
+        end_datetime = datetime(end.year, end.month, end.day, tzinfo=timezone.utc)
+
+        transmissions = Transmission.objects.filter(
+            station__country_code=country_code,
+            variable=variable,
+            received_date__gte=start_datetime,
+            received_date__lt=end_datetime,
+        )
+        aggregates = {
+            'avg_received_rate': Avg('received_rate'),
+            'avg_received': Avg('received'),
+            'avg_expected': Avg('expected'),
+            'station_count': Count('station', distinct=True),
+        }
+
+        rollups = []
+
+        country = transmissions.aggregate(**aggregates)
+        if country['station_count']:
+            rollups.append((RegionTransmission.LEVEL_COUNTRY, country_code, country_name, country))
+
+        regions = transmissions.exclude(station__admin1_gid='').exclude(station__admin1_gid__isnull=True) \
+            .values('station__admin1_gid', 'station__admin1_name').annotate(**aggregates)
+        for region in regions:
+            rollups.append((RegionTransmission.LEVEL_ADMIN1, region['station__admin1_gid'],
+                            region['station__admin1_name'], region))
+
+        for level, gid, name, values in rollups:
+            RegionTransmission.objects.update_or_create(
+                level=level,
+                gid=gid,
+                variable=variable,
+                month=start,
+                defaults={
+                    'country_code': country_code,
+                    'name': name,
+                    'avg_received_rate': float(values['avg_received_rate']),
+                    'avg_received': values['avg_received'],
+                    'avg_expected': values['avg_expected'],
+                    'station_count': values['station_count'],
+                }
+            )
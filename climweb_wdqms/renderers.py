@@ -0,0 +1,75 @@
+import json
+from decimal import Decimal
+
+from django.conf import settings
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 5 decimal places is about 1 m at the equator, well below station location accuracy
+DEFAULT_COORDINATE_PRECISION = 5
+
+
+def get_coordinate_precision():
+    return getattr(settings, "WDQMS_COORDINATE_PRECISION", DEFAULT_COORDINATE_PRECISION)
+
+
+def round_coordinates(coordinates, precision):
+    if isinstance(coordinates, (list, tuple)):
+        return [round_coordinates(value, precision) for value in coordinates]
+    if coordinates is None:
+        return None
+    return round(coordinates, precision)
+
+
+def round_geometries(data, precision):
+    """
+    Round the coordinates of a feature collection, a feature or a list of features
+    """
+    if isinstance(data, list):
+        return [round_geometries(item, precision) for item in data]
+
+    if isinstance(data, dict):
+        if isinstance(data.get('features'), list):
+            data = {**data, 'features': round_geometries(data['features'], precision)}
+
+        geometry = data.get('geometry')
+        if isinstance(geometry, dict) and 'coordinates' in geometry:
+            data = {**data, 'geometry': {**geometry,
+                                         'coordinates': round_coordinates(geometry['coordinates'], precision)}}
+
+    return data
+
+
+def default(obj):
+    # types orjson does not handle natively
+    if isinstance(obj, Decimal):
+        return float(obj)
+    return JSONEncoder().default(obj)
+
+
+class GeoJSONRenderer(BaseRenderer):
+    """
+    Compact JSON renderer for the large GeoJSON responses.
+
+    Coordinates are rounded to ``WDQMS_COORDINATE_PRECISION`` decimal places and the payload is
+    encoded with orjson when it is installed, falling back to the standard library json module.
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        data = round_geometries(data, get_coordinate_precision())
+
+        if orjson is not None:
+            return orjson.dumps(data, default=default)
+
+        return json.dumps(data, cls=JSONEncoder, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
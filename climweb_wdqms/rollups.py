@@ -0,0 +1,191 @@
+from datetime import datetime, timezone
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.db.models import Max, Min, Sum
+
+from climweb_wdqms.models import Transmission, TransmissionRollup
+from climweb_wdqms.regions import month_range
+
+# Transmission rows loaded per chunk from the server side cursor
+DEFAULT_CHUNK_SIZE = 50000
+
+SUM_COLUMNS = ['count', 'received_rate_sum', 'received_sum', 'received_count', 'expected_sum', 'expected_count']
+
+
+def iter_chunks(queryset, chunk_size):
+    rows = queryset.values_list('station_id', 'received_date', 'received_rate', 'received', 'expected') \
+        .iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        yield chunk
+
+
+def chunk_frame(chunk):
+    station_ids, received_dates, received_rates, received, expected = zip(*chunk)
+    received_dates = pd.to_datetime(received_dates, utc=True)
+
+    # None becomes NaN, so the sums and counts below skip missing values like the db aggregates do
+    received = np.array(received, dtype=float)
+    expected = np.array(expected, dtype=float)
+
+    return pd.DataFrame({
+        'station_id': np.array(station_ids, dtype=object),
+        'day': received_dates.normalize().tz_localize(None),
+        'synop_hour': received_dates.hour,
+        'received_rate': np.array(received_rates, dtype=float),
+        'received': np.nan_to_num(received),
+        'received_present': ~np.isnan(received),
+        'expected': np.nan_to_num(expected),
+        'expected_present': ~np.isnan(expected),
+    })
+
+
+def aggregate_frame(df, keys):
+    return df.groupby(keys, sort=False).agg(
+        count=('received_rate', 'size'),
+        received_rate_sum=('received_rate', 'sum'),
+        received_sum=('received', 'sum'),
+        received_count=('received_present', 'sum'),
+        expected_sum=('expected', 'sum'),
+        expected_count=('expected_present', 'sum'),
+    )
+
+
+def combine(partials, keys):
+    if not partials:
+        return None
+    return pd.concat(partials).groupby(level=keys, sort=False)[SUM_COLUMNS].sum()
+
+
+def to_rollups(frame, variable, frequency, period_start=None):
+    rollups = []
+    for key, row in zip(frame.index, frame.itertuples(index=False)):
+        key = key if isinstance(key, tuple) else (key,)
+        station_id = key[0]
+        rollups.append(TransmissionRollup(
+            station_id=station_id,
+            variable=variable,
+            frequency=frequency,
+            period_start=period_start or key[1].date(),
+            synop_hour=int(key[1]) if frequency == TransmissionRollup.FREQUENCY_SYNOP else None,
+            count=int(row.count),
+            received_rate_sum=float(row.received_rate_sum),
+            received_sum=int(row.received_sum),
+            received_count=int(row.received_count),
+            expected_sum=int(row.expected_sum),
+            expected_count=int(row.expected_count),
+        ))
+    return rollups
+
+
+def rebuild_month(variable, month, chunk_size=DEFAULT_CHUNK_SIZE, station_ids=None):
+    """
+    Rebuild the daily, monthly and per synop hour rollups of a variable for one month, of all stations
+    or only of station_ids. Transmissions are streamed in chunks and reduced with vectorized group-bys,
+    so memory is bounded by the number of groups, not rows
+    """
+    start, end = month_range(month)
+    transmissions = Transmission.objects.filter(
+        variable=variable,
+        received_date__gte=datetime(start.year, start.month, start.day, tzinfo=timezone.utc),
+        received_date__lt=datetime(end.year, end.month, end.day, tzinfo=timezone.utc),
+    ).order_by()
+    stored = TransmissionRollup.objects.filter(
+        variable=variable,
+        frequency__in=[TransmissionRollup.FREQUENCY_DAILY, TransmissionRollup.FREQUENCY_MONTHLY,
+                       TransmissionRollup.FREQUENCY_SYNOP],
+        period_start__gte=start,
+        period_start__lt=end,
+    )
+    if station_ids is not None:
+        transmissions = transmissions.filter(station_id__in=station_ids)
+        stored = stored.filter(station_id__in=station_ids)
+
+    daily_partials = []
+    synop_partials = []
+    for chunk in iter_chunks(transmissions, chunk_size):
+        df = chunk_frame(chunk)
+        daily_partials.append(aggregate_frame(df, ['station_id', 'day']))
+        synop_partials.append(aggregate_frame(df, ['station_id', 'synop_hour']))
+
+    daily = combine(daily_partials, ['station_id', 'day'])
+    synop = combine(synop_partials, ['station_id', 'synop_hour'])
+
+    rollups = []
+    if daily is not None:
+        monthly = daily.groupby(level='station_id', sort=False)[SUM_COLUMNS].sum()
+        rollups += to_rollups(daily, variable, TransmissionRollup.FREQUENCY_DAILY)
+        rollups += to_rollups(monthly, variable, TransmissionRollup.FREQUENCY_MONTHLY, period_start=start)
+        rollups += to_rollups(synop, variable, TransmissionRollup.FREQUENCY_SYNOP, period_start=start)
+
+    with transaction.atomic():
+        stored.delete()
+        TransmissionRollup.objects.bulk_create(rollups, batch_size=5000)
+
+    return len(rollups)
+
+
+def rebuild_year(variable, year, station_ids=None):
+    """
+    Yearly rollups are the sum of the monthly ones
+    """
+    monthly = TransmissionRollup.objects.filter(
+        variable=variable,
+        frequency=TransmissionRollup.FREQUENCY_MONTHLY,
+        period_start__year=year,
+    )
+    stored = TransmissionRollup.objects.filter(variable=variable, frequency=TransmissionRollup.FREQUENCY_YEARLY,
+                                               period_start__year=year)
+    if station_ids is not None:
+        monthly = monthly.filter(station_id__in=station_ids)
+        stored = stored.filter(station_id__in=station_ids)
+
+    monthly = monthly.values('station_id').annotate(**{column: Sum(column) for column in SUM_COLUMNS}).order_by()
+
+    rollups = [
+        TransmissionRollup(
+            station_id=row['station_id'],
+            variable=variable,
+            frequency=TransmissionRollup.FREQUENCY_YEARLY,
+            period_start=datetime(year, 1, 1).date(),
+            **{column: row[column] for column in SUM_COLUMNS}
+        )
+        for row in monthly
+    ]
+
+    with transaction.atomic():
+        stored.delete()
+        TransmissionRollup.objects.bulk_create(rollups, batch_size=5000)
+
+
+def refresh_rollups(variable, months, chunk_size=DEFAULT_CHUNK_SIZE, station_ids=None):
+    """
+    Rebuild the rollups of the given months and of their years, of all stations or only of station_ids,
+    e.g the stations touched by an ingest
+    """
+    if station_ids is not None:
+        station_ids = list(station_ids)
+    months = sorted({month.replace(day=1) for month in months})
+    for month in months:
+        rebuild_month(variable, month, chunk_size=chunk_size, station_ids=station_ids)
+    for year in sorted({month.year for month in months}):
+        rebuild_year(variable, year, station_ids=station_ids)
+
+
+def stored_months(variable):
+    dates = Transmission.objects.filter(variable=variable).aggregate(first=Min('received_date'),
+                                                                     last=Max('received_date'))
+    if dates['first'] is None:
+        return []
+
+    months = []
+    month = dates['first'].date().replace(day=1)
+    while month <= dates['last'].date():
+        months.append(month)
+        month = month_range(month)[1]
+    return months
@@ -0,0 +1,105 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+# Seconds the data versions of the primary and the replica are trusted before they are read again
+REPLICA_CHECK_INTERVAL = 5
+
+# Seconds of data the replica may be missing and still serve reads
+DEFAULT_REPLICA_MAX_LAG = 60
+
+_state = threading.local()
+
+
+def get_primary_alias():
+    return getattr(settings, "WDQMS_WRITE_DATABASE", "default")
+
+
+def get_replica_alias():
+    return getattr(settings, "WDQMS_READ_DATABASE", None)
+
+
+@contextmanager
+def use_replica():
+    """
+    Route reads of the WDQMS models to the read replica, if one is configured and up to date
+    """
+    previous = getattr(_state, "replica", False)
+    _state.replica = True
+    try:
+        yield
+    finally:
+        _state.replica = previous
+
+
+def bump_data_version():
+    """
+    Called after ingest commits. Records the version and the time of the write, replayed by the replica
+    """
+    from climweb_wdqms.models import DataVersion
+
+    primary = get_primary_alias()
+    with transaction.atomic(using=primary):
+        DataVersion.objects.using(primary).get_or_create(pk=1)
+        DataVersion.objects.using(primary).filter(pk=1).update(version=F('version') + 1, updated_at=timezone.now())
+
+
+def get_data_version(alias):
+    from climweb_wdqms.models import DataVersion
+
+    return DataVersion.objects.using(alias).filter(pk=1).values_list('version', 'updated_at').first() or (0, None)
+
+
+def replica_is_current(replica):
+    """
+    Whether the replica can serve reads: it has replayed the primary's latest version, or the last version it
+    replayed is at most WDQMS_REPLICA_MAX_LAG seconds old, so it misses at most that many seconds of writes.
+    Both versions are read from the databases, at most every REPLICA_CHECK_INTERVAL seconds per thread
+    """
+    now = time.monotonic()
+    checked_at, current = getattr(_state, "replica_current", (None, False))
+
+    if checked_at is None or now - checked_at > REPLICA_CHECK_INTERVAL:
+        primary_version, _ = get_data_version(get_primary_alias())
+        replica_version, replayed_at = get_data_version(replica)
+
+        max_lag = getattr(settings, "WDQMS_REPLICA_MAX_LAG", DEFAULT_REPLICA_MAX_LAG)
+        current = replica_version >= primary_version or (
+                replayed_at is not None and (timezone.now() - replayed_at).total_seconds() <= max_lag)
+        _state.replica_current = (now, current)
+
+    return current
+
+
+class WDQMSRouter:
+    """
+    Sends reads of the WDQMS models made inside use_replica(), i.e the API views, to WDQMS_READ_DATABASE
+    and everything else, including ingestion, to WDQMS_WRITE_DATABASE (the default database)
+    """
+    app_label = "climweb_wdqms"
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != self.app_label:
+            return None
+
+        replica = get_replica_alias()
+        if replica and getattr(_state, "replica", False) and replica_is_current(replica):
+            return replica
+
+        return get_primary_alias()
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label != self.app_label:
+            return None
+        return get_primary_alias()
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replica holds the same data as the primary
+        if self.app_label in (obj1._meta.app_label, obj2._meta.app_label):
+            return True
+        return None
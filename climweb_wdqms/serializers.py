@@ -1,6 +1,17 @@
 from rest_framework import serializers
 
-from climweb_wdqms.models import Transmission, Station
+from climweb_wdqms.models import Transmission, Station, StationSummary
+
+
+class StationSummarySerializer(serializers.ModelSerializer):
+    # stored as a small integer but read by name
+    variable = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = StationSummary
+        fields = ["variable", "latest_received_rate", "latest_received_date", "avg_received_rate", "trend",
+                  "best_synop_hour", "best_synop_received_rate", "worst_synop_hour", "worst_synop_received_rate",
+                  "updated_at"]
 
 
 class StationSerializer(serializers.ModelSerializer):
@@ -24,11 +35,16 @@ class StationSerializer(serializers.ModelSerializer):
         for field in representation:
             if field != 'geom':
                 feature['properties'][field] = representation[field]
+        if 'summary' in self.context.get('include', ()):
+            feature['properties']['summary'] = StationSummarySerializer(instance.summaries.all(), many=True).data
         return feature
         return representation
 
 class TransmissionSerializer(serializers.ModelSerializer):
+    # stored as a small integer but read by name
+    variable = serializers.CharField(read_only=True)
+
     class Meta:
         model = Transmission
-        fields = ["received_date", "station", "variable", "received_rate", "recieved", "expected"]
+        fields = ["id", "received_date", "station", "variable", "received_rate", "received", "expected", "updated_at"]
 
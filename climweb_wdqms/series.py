@@ -0,0 +1,76 @@
+import numpy as np
+
+DEFAULT_SERIES_POINTS = 500
+MAX_SERIES_POINTS = 5000
+
+METHOD_LTTB = 'lttb'
+METHOD_MEAN = 'mean'
+METHODS = [METHOD_LTTB, METHOD_MEAN]
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling. Returns the indices of the threshold points that best keep
+    the visual shape of the series, always including the first and the last point
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+
+    # threshold - 2 buckets over the points between the first and the last
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+
+    selected = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+
+        # the third triangle vertex is the average of the next bucket, or the last point
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], edges[i + 2]
+        else:
+            next_start, next_end = n - 1, n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        areas = np.abs((x[selected] - avg_x) * (y[start:end] - y[selected]) -
+                       (x[selected] - x[start:end]) * (avg_y - y[selected]))
+        selected = start + int(np.argmax(areas))
+        indices[i + 1] = selected
+
+    return indices
+
+
+def bucket_mean(x, y, threshold):
+    """
+    Average the series in threshold equal time buckets. Empty buckets are dropped
+    """
+    if threshold >= len(x):
+        return x, y
+
+    edges = np.linspace(x[0], x[-1], threshold + 1)
+    buckets = np.clip(np.searchsorted(edges, x, side='right') - 1, 0, threshold - 1)
+
+    counts = np.bincount(buckets, minlength=threshold)
+    x_sums = np.bincount(buckets, weights=x, minlength=threshold)
+    y_sums = np.bincount(buckets, weights=y, minlength=threshold)
+
+    filled = counts > 0
+    return x_sums[filled] / counts[filled], y_sums[filled] / counts[filled]
+
+
+def downsample(timestamps, values, points, method=METHOD_LTTB):
+    """
+    Downsample a series given as epoch seconds and values to at most points points
+    """
+    x = np.asarray(timestamps, dtype=np.float64)
+    y = np.asarray(values, dtype=np.float64)
+
+    if method == METHOD_MEAN:
+        return bucket_mean(x, y, points)
+
+    indices = lttb(x, y, points)
+    return x[indices], y[indices]
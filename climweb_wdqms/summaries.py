@@ -0,0 +1,99 @@
+from datetime import timedelta
+
+import pandas as pd
+from django.db import transaction
+from django.db.models import Max, Q
+
+from climweb_wdqms.models import StationSummary, Transmission
+
+# Days averaged on the summary card, the trend compares them with the same number of days before
+SUMMARY_DAYS = 30
+
+
+def recent_window(station_ids, variable, span):
+    """
+    Filter on the transmissions of each station received within span of its latest transmission,
+    None if the stations have no transmissions
+    """
+    latest = Transmission.objects.filter(station_id__in=station_ids, variable=variable) \
+        .values('station_id').annotate(latest=Max('received_date')).order_by()
+
+    # stations that reported in the same slice share their window, usually one range scan for the whole batch
+    window_stations = {}
+    for row in latest:
+        window_stations.setdefault(row['latest'] - span, []).append(row['station_id'])
+
+    if not window_stations:
+        return None
+
+    windows = Q()
+    for start, window_station_ids in window_stations.items():
+        windows |= Q(station_id__in=window_station_ids, received_date__gt=start)
+    return windows & Q(variable=variable)
+
+
+def summary_frame(station_ids, variable):
+    """
+    Transmissions of the last two summary windows of each station, the windows ending at the station's
+    latest transmission. None if the stations have no transmissions
+    """
+    window = recent_window(station_ids, variable, timedelta(days=2 * SUMMARY_DAYS))
+    if window is None:
+        return None
+
+    rows = Transmission.objects.filter(window).values_list('station_id', 'received_date', 'received_rate')
+
+    df = pd.DataFrame.from_records(list(rows), columns=['station_id', 'received_date', 'received_rate'])
+    df['received_date'] = pd.to_datetime(df['received_date'], utc=True)
+    df['age'] = df.groupby('station_id')['received_date'].transform('max') - df['received_date']
+
+    return df
+
+
+def compute_summaries(df, variable):
+    window = pd.Timedelta(days=SUMMARY_DAYS)
+    current = df[df['age'] < window]
+    previous = df[df['age'] >= window]
+
+    latest = df.loc[df.groupby('station_id')['received_date'].idxmax()].set_index('station_id')
+    avg_rates = current.groupby('station_id')['received_rate'].mean()
+    previous_avg_rates = previous.groupby('station_id')['received_rate'].mean()
+
+    hourly = current.groupby(['station_id', current['received_date'].dt.hour])['received_rate'].mean()
+    best = hourly.groupby(level='station_id').idxmax()
+    worst = hourly.groupby(level='station_id').idxmin()
+
+    summaries = []
+    for station_id, avg_rate in avg_rates.items():
+        previous_avg_rate = previous_avg_rates.get(station_id)
+        summaries.append(StationSummary(
+            station_id=station_id,
+            variable=variable,
+            latest_received_rate=float(latest.at[station_id, 'received_rate']),
+            latest_received_date=latest.at[station_id, 'received_date'].to_pydatetime(),
+            avg_received_rate=round(float(avg_rate), 2),
+            trend=None if previous_avg_rate is None else round(float(avg_rate - previous_avg_rate), 2),
+            best_synop_hour=int(best[station_id][1]),
+            best_synop_received_rate=round(float(hourly[best[station_id]]), 2),
+            worst_synop_hour=int(worst[station_id][1]),
+            worst_synop_received_rate=round(float(hourly[worst[station_id]]), 2),
+        ))
+    return summaries
+
+
+def refresh_station_summaries(station_ids, variable):
+    """
+    Recompute the summary cards of the given stations for a variable from their recent transmissions
+    """
+    station_ids = set(station_ids)
+    if not station_ids:
+        return 0
+
+    df = summary_frame(station_ids, variable)
+    summaries = compute_summaries(df, variable) if df is not None else []
+
+    with transaction.atomic():
+        StationSummary.objects.filter(station_id__in=station_ids, variable=variable).delete()
+        StationSummary.objects.bulk_create(summaries, batch_size=500)
+
+    return len(summaries)
@@ -0,0 +1,88 @@
+import base64
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+DEFAULT_SYNC_LIMIT = 1000
+MAX_SYNC_LIMIT = 10000
+
+# Rows updated more recently than this are held back, so that a slice still being written when a page is read
+# is not skipped by the next page, whose cursor is already past the slice's updated_at
+DEFAULT_SYNC_SETTLE_SECONDS = 60
+
+
+def encode_cursor(updated_at, pk):
+    raw = f"{updated_at.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor, pk_field):
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        updated_at, pk = raw.split("|", 1)
+        updated_at = datetime.fromisoformat(updated_at)
+        # the pk is compared in the page query, a value of the wrong type would fail there
+        pk = pk_field.to_python(pk)
+    except (ValueError, ValidationError):
+        return None
+    return updated_at, pk
+
+
+def parse_since(since, model):
+    """
+    Parse a since value, either a cursor returned by a previous page of model or an ISO 8601 timestamp or date.
+    Returns an (updated_at, pk) position, pk being None for timestamps. Raises ValueError if invalid
+    """
+    updated_at = parse_datetime(since)
+    if updated_at is None:
+        date = parse_date(since)
+        if date is not None:
+            updated_at = datetime.combine(date, time.min)
+
+    if updated_at is not None:
+        if timezone.is_naive(updated_at):
+            updated_at = timezone.make_aware(updated_at, dt_timezone.utc)
+        return updated_at, None
+
+    position = decode_cursor(since, model._meta.pk)
+    if position is None:
+        raise ValueError(f"Invalid since value '{since}'. Use an ISO 8601 timestamp or a cursor")
+    return position
+
+
+def parse_limit(limit):
+    if limit is None:
+        return DEFAULT_SYNC_LIMIT
+    limit = int(limit)
+    if limit < 1:
+        raise ValueError("limit must be a positive integer")
+    return min(limit, MAX_SYNC_LIMIT)
+
+
+def sync_page(queryset, since, limit):
+    """
+    Keyset page of the rows of queryset updated after since, ordered by (updated_at, pk).
+    Returns the rows, the cursor of the next page, None if the page is empty, and whether more rows are waiting
+    """
+    pk_name = queryset.model._meta.pk.name
+    settle_seconds = getattr(settings, "WDQMS_SYNC_SETTLE_SECONDS", DEFAULT_SYNC_SETTLE_SECONDS)
+    queryset = queryset.filter(updated_at__lte=timezone.now() - timedelta(seconds=settle_seconds))
+
+    if since is not None:
+        updated_at, pk = since
+        if pk is None:
+            queryset = queryset.filter(updated_at__gt=updated_at)
+        else:
+            queryset = queryset.filter(Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, **{f"{pk_name}__gt": pk}))
+
+    rows = list(queryset.order_by("updated_at", pk_name)[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = encode_cursor(rows[-1].updated_at, rows[-1].pk) if rows else None
+
+    return rows, next_cursor, has_more
@@ -0,0 +1,258 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from climweb_wdqms.constants import CENTERS, PERIODS, VARIABLES
+from climweb_wdqms.models import DailyIngest, IngestLock, IngestTask
+
+try:
+    from celery import shared_task
+except ImportError:
+    shared_task = None
+
+logger = logging.getLogger(__name__)
+
+# Locks older than this are considered left behind by a crashed worker
+DEFAULT_LOCK_TIMEOUT = 60 * 60
+
+# Failed or interrupted tasks are queued again after this delay, until they have been attempted this many times
+DEFAULT_TASK_RETRY_DELAY = 15 * 60
+DEFAULT_TASK_MAX_ATTEMPTS = 3
+
+# Hour of the day (UTC) after which the database worker enqueues the previous day
+DEFAULT_DAILY_INGEST_HOUR = 6
+
+BACKEND_DATABASE = "database"
+BACKEND_CELERY = "celery"
+
+_local = threading.local()
+
+
+class SliceNotRetrieved(Exception):
+    pass
+
+
+def get_backend():
+    backend = getattr(settings, "WDQMS_TASK_BACKEND", BACKEND_DATABASE)
+
+    if backend not in (BACKEND_DATABASE, BACKEND_CELERY):
+        raise ImproperlyConfigured(f"Unknown WDQMS_TASK_BACKEND '{backend}'. Use 'database' or 'celery'")
+
+    if backend == BACKEND_CELERY and shared_task is None:
+        raise ImproperlyConfigured("WDQMS_TASK_BACKEND is 'celery' but celery is not installed")
+
+    return backend
+
+
+def get_client():
+    from climweb_wdqms.client import WDQMSClient
+
+    # one pooled client per worker thread
+    if not hasattr(_local, "client"):
+        _local.client = WDQMSClient()
+    return _local.client
+
+
+def slice_lock_key(variable, date, period, country_code):
+    return f"{country_code}:{variable}:{date}:{period}"
+
+
+def acquire_lock(key):
+    timeout = getattr(settings, "WDQMS_LOCK_TIMEOUT", DEFAULT_LOCK_TIMEOUT)
+    IngestLock.objects.filter(key=key, acquired_at__lt=timezone.now() - timedelta(seconds=timeout)).delete()
+
+    try:
+        with transaction.atomic():
+            IngestLock.objects.create(key=key)
+        return True
+    except IntegrityError:
+        return False
+
+
+def release_lock(key):
+    IngestLock.objects.filter(key=key).delete()
+
+
+def run_ingest_slice(variable, date, period, centers, country_code, stations=None):
+    """
+    Ingest a single slice, unless another worker is already ingesting it. The station metadata is recorded on
+    the worker's StationSync if given, or applied with the slice.
+    Returns False if the slice was locked, raises SliceNotRetrieved if it could not be downloaded
+    """
+    # pandas is only loaded by the processes that ingest, not by the web workers that enqueue
+    from climweb_wdqms.ingest import ingest_slice
+
+    key = slice_lock_key(variable, date, period, country_code)
+
+    if not acquire_lock(key):
+        print(f"TASK: {key} is already being ingested, skipping")
+        return False
+
+    try:
+        if not ingest_slice(get_client(), date, period, variable, centers, country_code, stations=stations):
+            raise SliceNotRetrieved(f"Could not retrieve {key} from WDQMS")
+    finally:
+        release_lock(key)
+
+    return True
+
+
+def enqueue_slice(variable, date, period, centers, country_code):
+    if get_backend() == BACKEND_CELERY:
+        ingest_slice_task.delay(variable, date, period, centers, country_code)
+        return
+
+    task_data = {
+        'country_code': country_code,
+        'variable': variable,
+        'date': date,
+        'period': period,
+        'centers': ','.join(centers),
+    }
+
+    # a slice already waiting or running does not need another task
+    active = IngestTask.objects.filter(**task_data,
+                                       status__in=[IngestTask.STATUS_PENDING, IngestTask.STATUS_RUNNING])
+    if not active.exists():
+        IngestTask.objects.create(**task_data)
+
+
+def enqueue_transmission_rates(start_date, end_date, variables, periods, centers, country_codes):
+    from climweb_wdqms.ingest import generate_date_range
+
+    count = 0
+    for date in generate_date_range(start_date, end_date):
+        for country_code in country_codes:
+            for variable in variables:
+                for period in periods:
+                    enqueue_slice(variable, date, period, centers, country_code)
+                    count += 1
+    return count
+
+
+def enqueue_daily_ingest(date=None):
+    """
+    Enqueue all slices of a day, the previous one by default, for every country in the boundary manager
+    """
+    from adminboundarymanager.models import Country
+
+    if date is None:
+        date = datetime.now().date() - timedelta(days=1)
+
+    day = date.strftime("%Y-%m-%d")
+    country_codes = [country.country.alpha3 for country in Country.objects.all()]
+
+    return enqueue_transmission_rates(day, day, VARIABLES, PERIODS, CENTERS, country_codes)
+
+
+def schedule_daily_ingest():
+    """
+    Periodic schedule for the database backend. Enqueues the previous day once,
+    after WDQMS_DAILY_INGEST_HOUR (UTC). Its failed slices are retried by requeue_tasks
+    """
+    now = timezone.now()
+    if now.hour < getattr(settings, "WDQMS_DAILY_INGEST_HOUR", DEFAULT_DAILY_INGEST_HOUR):
+        return 0
+
+    yesterday = now.date() - timedelta(days=1)
+
+    try:
+        # the marker and the tasks are committed together, a failed run is scheduled again on the next round
+        with transaction.atomic():
+            schedule = DailyIngest.objects.create(date=yesterday)
+            schedule.slices = enqueue_daily_ingest(yesterday)
+            schedule.save(update_fields=['slices'])
+    except IntegrityError:
+        # already scheduled, by this worker or another one
+        return 0
+
+    return schedule.slices
+
+
+def requeue_tasks():
+    """
+    Queue again the failed tasks and the tasks left running by a crashed worker, once the retry delay or
+    the lock timeout has passed. Tasks that used up their attempts are left failed
+    """
+    now = timezone.now()
+    retry_delay = getattr(settings, "WDQMS_TASK_RETRY_DELAY", DEFAULT_TASK_RETRY_DELAY)
+    max_attempts = getattr(settings, "WDQMS_TASK_MAX_ATTEMPTS", DEFAULT_TASK_MAX_ATTEMPTS)
+    lock_timeout = getattr(settings, "WDQMS_LOCK_TIMEOUT", DEFAULT_LOCK_TIMEOUT)
+
+    stale = IngestTask.objects.filter(status=IngestTask.STATUS_RUNNING,
+                                      updated_at__lt=now - timedelta(seconds=lock_timeout))
+    stale.filter(attempts__gte=max_attempts).update(status=IngestTask.STATUS_FAILED,
+                                                    error="The worker stopped while running the task", updated_at=now)
+    # updated_at is kept, so that claim_task does not wait for the retry delay again
+    requeued = stale.update(status=IngestTask.STATUS_PENDING)
+
+    requeued += IngestTask.objects.filter(
+        status=IngestTask.STATUS_FAILED,
+        attempts__lt=max_attempts,
+        updated_at__lt=now - timedelta(seconds=retry_delay),
+    ).update(status=IngestTask.STATUS_PENDING)
+
+    return requeued
+
+
+def claim_task():
+    retry_delay = getattr(settings, "WDQMS_TASK_RETRY_DELAY", DEFAULT_TASK_RETRY_DELAY)
+
+    with transaction.atomic():
+        # retried tasks wait for the retry delay, e.g a slice locked by another worker
+        task = IngestTask.objects.select_for_update(skip_locked=True) \
+            .filter(Q(attempts=0) | Q(updated_at__lt=timezone.now() - timedelta(seconds=retry_delay)),
+                    status=IngestTask.STATUS_PENDING) \
+            .order_by('created_at').first()
+
+        if task is None:
+            return None
+
+        task.status = IngestTask.STATUS_RUNNING
+        task.attempts += 1
+        task.save(update_fields=['status', 'attempts', 'updated_at'])
+
+    return task
+
+
+def run_task(task, stations=None):
+    try:
+        if run_ingest_slice(task.variable, task.date.strftime("%Y-%m-%d"), task.period, task.centers.split(','),
+                            task.country_code, stations=stations):
+            task.status = IngestTask.STATUS_DONE
+            task.error = None
+        else:
+            # another worker holds the slice, check it again once that run is over
+            task.status = IngestTask.STATUS_PENDING
+            task.error = "The slice was locked by another worker"
+    except Exception as e:
+        logger.exception(f"TASK: Failed to ingest {task}")
+        task.status = IngestTask.STATUS_FAILED
+        task.error = str(e)
+    finally:
+        task.save(update_fields=['status', 'error', 'updated_at'])
+        close_old_connections()
+
+
+if shared_task is not None:
+    _retry_delay = getattr(settings, "WDQMS_TASK_RETRY_DELAY", DEFAULT_TASK_RETRY_DELAY)
+    _max_attempts = getattr(settings, "WDQMS_TASK_MAX_ATTEMPTS", DEFAULT_TASK_MAX_ATTEMPTS)
+
+
+    # slices that could not be downloaded are retried after the retry delay, doubled on every attempt
+    @shared_task(name="climweb_wdqms.ingest_slice", ignore_result=True, autoretry_for=(SliceNotRetrieved,),
+                 max_retries=_max_attempts - 1, retry_backoff=_retry_delay,
+                 retry_backoff_max=_retry_delay * 2 ** _max_attempts, retry_jitter=False)
+    def ingest_slice_task(variable, date, period, centers, country_code):
+        run_ingest_slice(variable, date, period, centers, country_code)
+
+
+    @shared_task(name="climweb_wdqms.daily_ingest", ignore_result=True)
+    def daily_ingest_task():
+        enqueue_daily_ingest()
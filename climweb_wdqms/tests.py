@@ -1,3 +1,599 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from django import forms
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from climweb_wdqms import routers
+from climweb_wdqms.admin import ReceivedMonthListFilter
+from climweb_wdqms.cache import ResponseCache
+from climweb_wdqms.client import WDQMSClient
+from climweb_wdqms.health import update_station_health
+from climweb_wdqms.ingest import StationSync
+from climweb_wdqms.models import DailyIngest, DataVersion, Station, StationHealth, Transmission, TransmissionSlice
+from climweb_wdqms.planner import count_slices, plan_missing_slices
+from climweb_wdqms.rollups import refresh_rollups
+from climweb_wdqms.series import bucket_mean, downsample, lttb
+from climweb_wdqms.summaries import SUMMARY_DAYS, summary_frame
+from climweb_wdqms.sync import encode_cursor
+from climweb_wdqms.tasks import schedule_daily_ingest
+from climweb_wdqms.views import MonthlyTransmissionView, SynopTransmissionView, TransmissionSyncView, \
+    YearlyTransmissionView
 
 # Create your tests here.
+
+# Modules loaded by the web workers and by every management command
+WEB_MODULES = [
+    "climweb_wdqms.urls",
+    "climweb_wdqms.admin",
+    "climweb_wdqms.tasks",
+    "climweb_wdqms.management.commands.wdqms_stats",
+    "climweb_wdqms.management.commands.wdqms_rollups",
+    "climweb_wdqms.management.commands.wdqms_worker",
+]
+
+# Modules that must only be loaded when ingesting
+INGEST_MODULES = ["pandas", "climweb_wdqms.ingest", "climweb_wdqms.client", "climweb_wdqms.rollups",
+                  "climweb_wdqms.summaries"]
+
+re_import_time = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)$")
+
+
+class ImportTimeTest(SimpleTestCase):
+
+    def import_times(self):
+        code = f"import django; django.setup(); import {', '.join(WEB_MODULES)}"
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                                env=os.environ.copy())
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+        times = {}
+        for line in result.stderr.splitlines():
+            match = re_import_time.match(line)
+            if match:
+                times[match.group(4)] = int(match.group(1))
+        return times
+
+    def test_web_imports_skip_ingest_dependencies(self):
+        times = self.import_times()
+
+        for module in INGEST_MODULES:
+            self.assertFalse(module in times, f"{module} is imported outside of the ingest path")
+
+
+REPLICA_ALIAS = "replica"
+
+
+def has_separate_replica():
+    replica = settings.DATABASES.get(REPLICA_ALIAS)
+    return replica is not None and not replica.get("TEST", {}).get("MIRROR")
+
+
+@unittest.skipUnless(has_separate_replica(), "needs a 'replica' database alias that is not a test mirror")
+@override_settings(WDQMS_READ_DATABASE=REPLICA_ALIAS, WDQMS_REPLICA_MAX_LAG=60)
+class ReplicaRouterTest(TestCase):
+    # the test runner sets up every alias listed here, skipped or not
+    databases = {"default", REPLICA_ALIAS} if has_separate_replica() else {"default"}
+
+    def setUp(self):
+        # forget the versions checked by a previous test
+        routers._state.__dict__.pop("replica_current", None)
+
+    def set_version(self, alias, version, age=0):
+        # updated_at is auto_now, so it is only set as given by an update
+        DataVersion.objects.using(alias).get_or_create(pk=1)
+        DataVersion.objects.using(alias).filter(pk=1).update(
+            version=version, updated_at=timezone.now() - timedelta(seconds=age))
+
+    def read_alias(self):
+        with routers.use_replica():
+            return Station.objects.all().db
+
+    def test_reads_outside_the_views_use_the_primary(self):
+        self.set_version("default", 1)
+        self.set_version(REPLICA_ALIAS, 1)
+        self.assertEqual(Station.objects.all().db, "default")
+
+    def test_current_replica_serves_reads(self):
+        self.set_version("default", 3)
+        self.set_version(REPLICA_ALIAS, 3)
+        self.assertEqual(self.read_alias(), REPLICA_ALIAS)
+
+    def test_replica_within_the_lag_serves_reads(self):
+        self.set_version("default", 5)
+        self.set_version(REPLICA_ALIAS, 4, age=10)
+        self.assertEqual(self.read_alias(), REPLICA_ALIAS)
+
+    def test_replica_behind_the_lag_falls_back_to_the_primary(self):
+        self.set_version("default", 5)
+        self.set_version(REPLICA_ALIAS, 4, age=600)
+        self.assertEqual(self.read_alias(), "default")
+
+    def test_writes_go_to_the_primary(self):
+        routers.bump_data_version()
+        self.assertEqual(DataVersion.objects.using("default").get(pk=1).version, 1)
+        self.assertFalse(DataVersion.objects.using(REPLICA_ALIAS).exists())
+
+
+class ReceivedMonthListFilterTest(TestCase):
+
+    def lookups(self):
+        list_filter = ReceivedMonthListFilter(None, {}, Transmission, None)
+        return [value for value, label in list_filter.lookups(None, None)]
+
+    def test_months_between_the_first_and_the_last_transmission(self):
+        station = Station.objects.create(wigos_id="0-20000-0-63740", name="Nairobi",
+                                         geom=Point(36.8, -1.3, srid=4326), in_oscar=True)
+        Transmission.objects.bulk_create([
+            Transmission(station=station, variable="pressure", received=4, expected=4, received_rate=100,
+                         received_date=received_date)
+            for received_date in (datetime(2023, 11, 30, 18, tzinfo=dt_timezone.utc),
+                                  datetime(2024, 2, 1, tzinfo=dt_timezone.utc))
+        ])
+
+        self.assertEqual(self.lookups(), ["2024-02", "2024-01", "2023-12", "2023-11"])
+
+    def test_no_transmissions(self):
+        self.assertEqual(self.lookups(), [])
+
+
+class TransmissionVariableForm(forms.ModelForm):
+    class Meta:
+        model = Transmission
+        fields = ["variable"]
+
+
+class LabelChoiceFieldTest(SimpleTestCase):
+
+    def test_form_selects_the_names(self):
+        form = TransmissionVariableForm(instance=Transmission(variable="pressure"))
+        self.assertIsInstance(form.fields["variable"], forms.TypedChoiceField)
+        self.assertEqual(form.initial["variable"], "pressure")
+
+    def test_form_saves_a_name(self):
+        transmission = Transmission(variable="pressure")
+        form = TransmissionVariableForm({"variable": "humidity"}, instance=transmission)
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(transmission.variable, "humidity")
+
+    def test_form_rejects_unknown_names(self):
+        form = TransmissionVariableForm({"variable": "wind"}, instance=Transmission())
+        self.assertFalse(form.is_valid())
+
+
+class FakeAdapter(BaseAdapter):
+    """
+    Transport answering the queued (status, headers, body) responses, or raising the queued exceptions
+    """
+
+    def __init__(self, *responses):
+        super().__init__()
+        self.responses = list(responses)
+        self.requests = []
+
+    def send(self, request, **kwargs):
+        self.requests.append(request)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+
+        status_code, headers, body = response
+        fake = requests.Response()
+        fake.status_code = status_code
+        fake.headers = CaseInsensitiveDict(headers)
+        fake.raw = io.BytesIO(body)
+        fake.request = request
+        fake.url = request.url
+        return fake
+
+    def close(self):
+        pass
+
+
+class WDQMSClientTest(SimpleTestCase):
+    slice = ("2024-01-01", "00", "pressure", ["DWD", "ECMWF"], "OSCAR")
+    body = b"name,wigosid\nNairobi,0-20000-0-63740\n"
+
+    def setUp(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        self.cache = ResponseCache(cache_dir)
+        self.key = self.cache.make_key(*self.slice)
+
+        # the client reports its progress with prints
+        stdout = mock.patch("sys.stdout", new_callable=io.StringIO)
+        stdout.start()
+        self.addCleanup(stdout.stop)
+
+    def make_client(self, *responses):
+        transport = FakeAdapter(*responses)
+        return WDQMSClient(base_url="https://wdqms.test/download", transport=transport, cache=self.cache), transport
+
+    def cache_unsettled(self, etag):
+        """
+        Cache the body as fetched on the slice date, so it is revalidated
+        """
+        entry = self.cache.put(self.key, self.body, self.slice[0], etag=etag)
+        entry["fetched_at"] = self.slice[0]
+        self.cache._write_atomic(self.cache._index_path(self.key), json.dumps(entry).encode("utf-8"))
+
+    def test_200_is_returned_and_cached(self):
+        client, transport = self.make_client((200, {"ETag": '"v1"'}, self.body))
+
+        self.assertEqual(client.fetch(*self.slice), self.body)
+        self.assertNotIn("If-None-Match", transport.requests[0].headers)
+
+        entry = self.cache.get(self.key)
+        self.assertEqual(entry["etag"], '"v1"')
+        self.assertEqual(self.cache.read(entry), self.body)
+
+    def test_304_is_served_from_the_cache(self):
+        self.cache_unsettled('"v1"')
+        client, transport = self.make_client((304, {}, b""))
+
+        self.assertEqual(client.fetch(*self.slice), self.body)
+        self.assertEqual(transport.requests[0].headers["If-None-Match"], '"v1"')
+
+        # revalidated long after the slice date, so it is final and not requested again
+        entry = self.cache.get(self.key)
+        self.assertEqual(entry["fetched_at"], datetime.now(dt_timezone.utc).strftime("%Y-%m-%d"))
+        self.assertTrue(self.cache.is_final(entry))
+        self.assertEqual(client.fetch(*self.slice), self.body)
+        self.assertEqual(len(transport.requests), 1)
+
+    def test_offline_reads_only_the_cache(self):
+        client, transport = self.make_client()
+
+        self.assertIsNone(client.fetch(*self.slice, offline=True))
+
+        self.cache_unsettled('"v1"')
+        self.assertEqual(client.fetch(*self.slice, offline=True), self.body)
+        self.assertEqual(transport.requests, [])
+
+    def test_request_exception_returns_none(self):
+        client, transport = self.make_client(requests.ConnectionError("connection refused"))
+
+        self.assertIsNone(client.fetch(*self.slice))
+        self.assertIsNone(self.cache.get(self.key))
+
+    def test_error_status_returns_none(self):
+        client, transport = self.make_client((500, {}, b"error"))
+
+        self.assertIsNone(client.fetch(*self.slice))
+        self.assertIsNone(self.cache.get(self.key))
+
+
+# the rows are only written to the default database
+@override_settings(WDQMS_READ_DATABASE=None)
+class TransmissionSyncTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        station = Station.objects.create(wigos_id="0-20000-0-63740", name="Nairobi", geom=Point(36.8, -1.3, srid=4326),
+                                         in_oscar=True)
+        received_date = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+        Transmission.objects.bulk_create([
+            Transmission(station=station, variable="pressure", received=4, expected=4, received_rate=100,
+                         received_date=received_date + timedelta(hours=6 * i))
+            for i in range(5)
+        ])
+        # one slice: every row shares the same updated_at
+        cls.updated_at = timezone.now() - timedelta(hours=1)
+        Transmission.objects.update(updated_at=cls.updated_at)
+
+    def sync(self, **params):
+        request = APIRequestFactory().get("/api/transmissions/", params)
+        return TransmissionSyncView.as_view()(request)
+
+    def test_pages_through_ties_in_updated_at(self):
+        ids = []
+        since = None
+        for _ in range(3):
+            response = self.sync(limit=2, **({"since": since} if since else {}))
+            self.assertEqual(response.status_code, 200)
+            ids += [row["id"] for row in response.data["results"]]
+            since = response.data["next"]
+
+        self.assertFalse(response.data["has_more"])
+        self.assertEqual(ids, sorted(Transmission.objects.values_list("id", flat=True)))
+
+    def test_last_cursor_returns_an_empty_page(self):
+        last = Transmission.objects.order_by("id").last()
+        cursor = encode_cursor(self.updated_at, last.pk)
+
+        response = self.sync(since=cursor)
+        self.assertEqual(response.data["results"], [])
+        self.assertEqual(response.data["next"], cursor)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.sync(since="not-a-cursor")
+        self.assertEqual(response.status_code, 400)
+
+    def test_cursor_with_an_invalid_pk_is_rejected(self):
+        cursor = base64.urlsafe_b64encode(f"{self.updated_at.isoformat()}|abc".encode("utf-8")).decode("ascii")
+
+        response = self.sync(since=cursor)
+        self.assertEqual(response.status_code, 400)
+
+    def test_recent_rows_are_held_back(self):
+        Transmission.objects.filter(pk=Transmission.objects.order_by("id").first().pk).update(updated_at=timezone.now())
+
+        response = self.sync()
+        self.assertEqual(len(response.data["results"]), 4)
+
+        with override_settings(WDQMS_SYNC_SETTLE_SECONDS=0):
+            response = self.sync()
+        self.assertEqual(len(response.data["results"]), 5)
+
+
+@override_settings(WDQMS_DAILY_INGEST_HOUR=0)
+class DailyScheduleTest(TestCase):
+
+    @mock.patch("climweb_wdqms.tasks.enqueue_daily_ingest", return_value=12)
+    def test_previous_day_is_enqueued_once(self, enqueue_daily_ingest):
+        self.assertEqual(schedule_daily_ingest(), 12)
+        self.assertEqual(schedule_daily_ingest(), 0)
+
+        enqueue_daily_ingest.assert_called_once()
+        self.assertEqual(DailyIngest.objects.get().slices, 12)
+
+    @mock.patch("climweb_wdqms.tasks.enqueue_daily_ingest", side_effect=RuntimeError)
+    def test_failed_schedule_is_not_marked(self, enqueue_daily_ingest):
+        with self.assertRaises(RuntimeError):
+            schedule_daily_ingest()
+
+        self.assertFalse(DailyIngest.objects.exists())
+
+
+class SeriesDownsampleTest(SimpleTestCase):
+
+    def setUp(self):
+        # a week of six hourly periods with a spike, as epoch seconds
+        self.x = np.arange(0, 1000 * 21600, 21600, dtype=np.float64)
+        self.y = np.sin(np.arange(1000) / 20) * 50 + 50
+        self.y[500] = 400
+
+    def test_lttb_keeps_the_budget_and_the_ends(self):
+        indices = lttb(self.x, self.y, 100)
+
+        self.assertEqual(len(indices), 100)
+        self.assertEqual(indices[0], 0)
+        self.assertEqual(indices[-1], len(self.x) - 1)
+        self.assertTrue(np.all(np.diff(indices) > 0))
+        # the spike is the largest triangle of its bucket
+        self.assertIn(500, indices)
+
+    def test_lttb_returns_short_series_unchanged(self):
+        self.assertEqual(list(lttb(self.x[:10], self.y[:10], 100)), list(range(10)))
+        self.assertEqual(list(lttb(self.x[:10], self.y[:10], 10)), list(range(10)))
+        self.assertEqual(list(lttb(self.x, self.y, 2)), list(range(len(self.x))))
+
+    def test_lttb_empty_series(self):
+        self.assertEqual(len(lttb(np.array([]), np.array([]), 100)), 0)
+
+    def test_bucket_mean_keeps_the_budget(self):
+        x, y = bucket_mean(self.x, self.y, 100)
+
+        self.assertEqual(len(x), 100)
+        self.assertEqual(len(y), 100)
+        self.assertTrue(np.all(np.diff(x) > 0))
+        self.assertGreaterEqual(x[0], self.x[0])
+        self.assertLessEqual(x[-1], self.x[-1])
+        self.assertAlmostEqual(y.mean(), self.y.mean(), delta=1)
+
+    def test_bucket_mean_drops_empty_buckets(self):
+        # two clusters of points, the buckets between them are empty
+        x = np.array([0, 1, 2, 100, 101, 102], dtype=np.float64)
+        y = np.array([1, 2, 3, 4, 5, 6], dtype=np.float64)
+
+        bucket_x, bucket_y = bucket_mean(x, y, 5)
+        self.assertEqual(list(bucket_x), [1, 101])
+        self.assertEqual(list(bucket_y), [2, 5])
+
+    def test_bucket_mean_returns_short_series_unchanged(self):
+        x, y = bucket_mean(self.x[:10], self.y[:10], 100)
+        self.assertEqual(list(x), list(self.x[:10]))
+        self.assertEqual(list(y), list(self.y[:10]))
+
+    def test_downsample_empty_series(self):
+        for method in ("lttb", "mean"):
+            x, y = downsample([], [], 100, method=method)
+            self.assertEqual((len(x), len(y)), (0, 0))
+
+
+class SummaryFrameTest(TestCase):
+
+    def test_window_ends_at_each_station_latest_transmission(self):
+        received_date = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+        transmissions = []
+        # a station still reporting and one that stopped a year earlier, both with daily rows over 200 days
+        for wigos_id, offset in [("0-20000-0-63740", 365), ("0-20000-0-63741", 0)]:
+            station = Station.objects.create(wigos_id=wigos_id, name=wigos_id, geom=Point(36.8, -1.3, srid=4326),
+                                             in_oscar=True)
+            transmissions += [
+                Transmission(station=station, variable="pressure", received=4, expected=4, received_rate=100,
+                             received_date=received_date + timedelta(days=offset + day))
+                for day in range(200)
+            ]
+        Transmission.objects.bulk_create(transmissions)
+
+        df = summary_frame(["0-20000-0-63740", "0-20000-0-63741"], "pressure")
+
+        counts = df.groupby("station_id").size()
+        self.assertEqual(counts["0-20000-0-63740"], 2 * SUMMARY_DAYS)
+        self.assertEqual(counts["0-20000-0-63741"], 2 * SUMMARY_DAYS)
+
+    def test_no_transmissions(self):
+        self.assertIsNone(summary_frame(["0-20000-0-63740"], "pressure"))
+
+
+class StationHealthTest(TestCase):
+
+    def setUp(self):
+        self.station = Station.objects.create(wigos_id="0-20000-0-63740", name="Nairobi",
+                                              geom=Point(36.8, -1.3, srid=4326), in_oscar=True)
+        self.received_date = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+
+    def store(self, periods, received):
+        Transmission.objects.bulk_create([
+            Transmission(station=self.station, variable="pressure", received=received, expected=4,
+                         received_rate=received * 25, received_date=self.received_date + timedelta(hours=6 * period))
+            for period in periods
+        ])
+
+    def test_silent_after_the_latest_periods_without_transmissions(self):
+        self.store(range(40), 4)
+        self.store(range(40, 44), 0)
+
+        update_station_health([self.station.pk], "pressure")
+
+        health = StationHealth.objects.get(station=self.station, variable="pressure")
+        self.assertEqual(health.status, StationHealth.STATUS_SILENT)
+        self.assertEqual(health.consecutive_zero_periods, 4)
+        self.assertEqual(health.last_received_date, self.received_date + timedelta(hours=6 * 43))
+
+    def test_backfilled_periods_count_once(self):
+        # the latest periods first, then the history before them, and the same history again
+        self.store(range(40, 44), 4)
+        update_station_health([self.station.pk], "pressure")
+        self.store(range(40), 0)
+        update_station_health([self.station.pk], "pressure")
+        update_station_health([self.station.pk], "pressure")
+
+        health = StationHealth.objects.get(station=self.station, variable="pressure")
+        self.assertEqual(health.consecutive_zero_periods, 0)
+        # 24 empty periods then 4 full ones, within the 28 periods window
+        self.assertAlmostEqual(health.ewma_received_rate, 100 * (1 - 0.7 ** 4), places=5)
+
+
+class PlanMissingSlicesTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # 2024-01-01 00 recorded as a slice, 2024-01-01 06 only as transmissions ingested before the slices
+        TransmissionSlice.objects.create(country_code="KEN", variable="pressure", date=datetime(2024, 1, 1).date(),
+                                         period="00", content_hash="0" * 64)
+        station = Station.objects.create(wigos_id="0-20000-0-63740", name="Nairobi", country_code="KEN",
+                                         geom=Point(36.8, -1.3, srid=4326), in_oscar=True)
+        other_station = Station.objects.create(wigos_id="0-20000-0-64400", name="Pointe-Noire", country_code="COG",
+                                               geom=Point(11.9, -4.8, srid=4326), in_oscar=True)
+        Transmission.objects.bulk_create([
+            Transmission(station=station, variable="pressure", received=4, expected=4, received_rate=100,
+                         received_date=datetime(2024, 1, 1, 6, tzinfo=dt_timezone.utc)),
+            Transmission(station=other_station, variable="pressure", received=4, expected=4, received_rate=100,
+                         received_date=datetime(2024, 1, 1, 12, tzinfo=dt_timezone.utc)),
+        ])
+
+    def test_slices_and_transmissions_are_not_missing(self):
+        plan = plan_missing_slices("2024-01-01", "2024-01-02", ["pressure"], ["00", "06", "12"], ["KEN"])
+
+        self.assertEqual(plan, {"KEN": {"pressure": [("2024-01-01", "12"), ("2024-01-02", "00"),
+                                                     ("2024-01-02", "06"), ("2024-01-02", "12")]}})
+        self.assertEqual(count_slices(plan), 4)
+
+    def test_complete_variables_are_left_out(self):
+        plan = plan_missing_slices("2024-01-01", "2024-01-01", ["pressure", "temperature"], ["00", "06"],
+                                   ["KEN"])
+
+        self.assertEqual(plan, {"KEN": {"temperature": [("2024-01-01", "00"), ("2024-01-01", "06")]}})
+
+
+class StationSyncTest(TestCase):
+
+    def slice_frame(self, name, longitude=36.8):
+        return pd.DataFrame({'wigosid': ["0-20000-0-63740"], 'name': [name], 'longitude': [longitude],
+                             'latitude': [-1.3], 'in OSCAR': [True], 'country code': ["KEN"]})
+
+    def test_missing_stations_are_created_on_add(self):
+        stations = StationSync()
+        stations.add(self.slice_frame("Nairobi"), "2024-01-01", "00")
+
+        station = Station.objects.get(wigos_id="0-20000-0-63740")
+        self.assertEqual(station.name, "Nairobi")
+        self.assertEqual(station.country_code, "KEN")
+
+    def test_apply_keeps_the_latest_slice_metadata(self):
+        stations = StationSync()
+        stations.add(self.slice_frame("Nairobi"), "2024-01-01", "00")
+        stations.add(self.slice_frame("Nairobi Dagoretti", 36.7), "2024-01-02", "00")
+        stations.add(self.slice_frame("Nairobi JKIA"), "2024-01-01", "06")
+
+        self.assertEqual(stations.apply(), 1)
+
+        station = Station.objects.get(wigos_id="0-20000-0-63740")
+        self.assertEqual(station.name, "Nairobi Dagoretti")
+        self.assertAlmostEqual(station.geom.x, 36.7)
+        # the recorded changes are written once
+        self.assertEqual(stations.apply(), 0)
+
+
+@override_settings(WDQMS_READ_DATABASE=None)
+class RollupViewsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        station = Station.objects.create(wigos_id="0-20000-0-63740", name="Nairobi", geom=Point(36.8, -1.3, srid=4326),
+                                         in_oscar=True)
+        received_date = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+        # January and February, every period, with the 06 UTC period missing a count
+        Transmission.objects.bulk_create([
+            Transmission(station=station, variable="pressure", received=None if period % 4 == 1 else period % 5,
+                         expected=4, received_rate=(period % 5) * 25,
+                         received_date=received_date + timedelta(hours=6 * period))
+            for period in range(4 * 60)
+        ])
+        refresh_rollups("pressure", [datetime(2024, 1, 1).date(), datetime(2024, 2, 1).date()])
+
+    def get(self, view, **params):
+        response = view.as_view()(APIRequestFactory().get("/", params))
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def averages(self, transmissions):
+        rates = [t.received_rate for t in transmissions]
+        received = [t.received for t in transmissions if t.received is not None]
+        return (round(sum(rates) / len(rates), 0), round(sum(received) / len(received), 0), 4)
+
+    def test_monthly_matches_the_transmissions(self):
+        data = self.get(MonthlyTransmissionView, year=2024, variable="pressure")
+
+        self.assertEqual([row["month"] for row in data], ["January", "February"])
+        january = Transmission.objects.filter(received_date__month=1)
+        self.assertEqual((data[0]["avg_received_rate"], data[0]["avg_received"], data[0]["avg_expected"]),
+                         self.averages(january))
+
+    def test_yearly_matches_the_transmissions(self):
+        data = self.get(YearlyTransmissionView, variable="pressure")
+
+        self.assertEqual(len(data), 1)
+        self.assertEqual((data[0]["avg_received_rate"], data[0]["avg_received"], data[0]["avg_expected"]),
+                         self.averages(Transmission.objects.all()))
+
+    def test_synop_hours_match_the_transmissions(self):
+        data = self.get(SynopTransmissionView, frequency="yearly_synop", received_date="2024-01-01",
+                        variable="pressure")
+
+        self.assertEqual([row["synop_hour"] for row in data], ["00", "06", "12", "18"])
+        six = Transmission.objects.filter(received_date__hour=6)
+        self.assertEqual(data[1]["avg_received_rate"], self.averages(six)[0])
+        self.assertIsNone(data[1]["avg_received"])
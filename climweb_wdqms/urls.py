@@ -5,13 +5,23 @@ from .views import (
     SynopTransmissionView,
     MonthlyTransmissionView,
     YearlyTransmissionView,
-    AverageMonthlyReceivedRateGeom
+    RegionTransmissionView,
+    AverageMonthlyReceivedRateGeom,
+    CenterTransmissionView,
+    StationAlertView,
+    TransmissionSyncView,
+    TransmissionSeriesView
 )
 
 urlpatterns = [
     path('api/synop-transmission-rate/', SynopTransmissionView.as_view(), name='synop-transmission-rate'),
     path('api/monthly-transmission-rate/', MonthlyTransmissionView.as_view(), name='monthly-transmission-rate'),
+    path('api/region-transmission-rate/', RegionTransmissionView.as_view(), name='region-transmission-rate'),
     path('api/yearly-transmission-rate/', YearlyTransmissionView.as_view(), name='yearly-transmission-rate'),
     path('api/monthly-geom-transmission-rate/', AverageMonthlyReceivedRateGeom.as_view(), name='monthly-geom-transmission-rate'),
+    path('api/center-transmission-rate/', CenterTransmissionView.as_view(), name='center-transmission-rate'),
     path('api/stations/', StationListView.as_view(), name='station-list'),
+    path('api/station-alerts/', StationAlertView.as_view(), name='station-alerts'),
+    path('api/transmissions/', TransmissionSyncView.as_view(), name='transmission-sync'),
+    path('api/transmission-series/', TransmissionSeriesView.as_view(), name='transmission-series'),
 ]
\ No newline at end of file
@@ -1,17 +1,24 @@
 from django.shortcuts import render
 import pytz
-import json
 
+from django.utils.decorators import method_decorator
 from rest_framework.generics import ListAPIView
-from climweb_wdqms.models import Transmission, Station
+from climweb_wdqms.models import Transmission, Station, StationHealth, RegionTransmission, CenterTransmission, \
+    TransmissionRollup
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.permissions import BasePermission, IsAuthenticated, SAFE_METHODS
-from climweb_wdqms.serializers import StationSerializer
-from datetime import datetime
+from climweb_wdqms.compression import compress_page
+from climweb_wdqms.renderers import GeoJSONRenderer
+from climweb_wdqms.routers import use_replica
+from climweb_wdqms.serializers import StationSerializer, TransmissionSerializer
+from climweb_wdqms.series import DEFAULT_SERIES_POINTS, MAX_SERIES_POINTS, METHOD_LTTB, METHODS, downsample
+from climweb_wdqms.sync import parse_limit, parse_since, sync_page
+from datetime import datetime, timedelta
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from django.db.models.functions import ExtractHour, ExtractMonth, ExtractYear
-from django.db.models import Avg, Func, F
+from django.db.models import Avg, Case, FloatField, Func, F, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, NullIf
 from django.db.models.functions import TruncMonth
 
 
@@ -35,26 +42,131 @@ def validate_params(query_params, supported_params):
     return error_message
 
 
+def rollup_averages():
+    """
+    Averages over the rows behind the summed rollups, the same as Avg over the transmissions
+    """
+    return {
+        'avg_received_rate': Sum('received_rate_sum') / NullIf(Sum('count'), 0),
+        'avg_received': Cast(Sum('received_sum'), FloatField()) / NullIf(Sum('received_count'), 0),
+        'avg_expected': Cast(Sum('expected_sum'), FloatField()) / NullIf(Sum('expected_count'), 0),
+    }
+
+
+def round_average(value):
+    return round(value, 0) if value is not None else None
+
+
 class ReadOnly(BasePermission):
     def has_permission(self, request, view):
         return request.method in SAFE_METHODS
 
 
-class StationListView(ListAPIView):
+class ReplicaReadMixin:
+    """
+    Serve the view's queries from the read replica when one is configured
+    """
+    
+    def dispatch(self, request, *args, **kwargs):
+        with use_replica():
+            return super().dispatch(request, *args, **kwargs)
+
+
+@method_decorator(compress_page, name='dispatch')
+class StationListView(ReplicaReadMixin, ListAPIView):
     queryset = Station.objects.all()
     serializer_class = StationSerializer
     permission_classes = [IsAuthenticated | ReadOnly]
+    renderer_classes = [GeoJSONRenderer]
+    
+    supported_includes = ['summary']
+    
+    def get_includes(self):
+        include = self.request.query_params.get('include', None)
+        return [item for item in include.split(',') if item] if include else []
     
     def get_queryset(self):
         queryset = super().get_queryset()
         wigos_id = self.request.query_params.get('wigos_id')
         if wigos_id:
             queryset = queryset.filter(wigos_id=wigos_id)
+        if 'summary' in self.get_includes():
+            # all summary cards in one extra query
+            queryset = queryset.prefetch_related('summaries')
         return queryset
+    
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['include'] = self.get_includes()
+        return context
+    
+    def list(self, request, *args, **kwargs):
+        unsupported_includes = [item for item in self.get_includes() if item not in self.supported_includes]
+        if unsupported_includes:
+            return Response({'error': f'Unsupported include(s): {", ".join(unsupported_includes)}. '
+                                      f'Only Supports {", ".join(self.supported_includes)}'}, status=400)
+        
+        since = request.query_params.get('since', None)
+        if since is None:
+            return super().list(request, *args, **kwargs)
+        
+        # only the stations added or changed since the given timestamp or cursor
+        try:
+            position = parse_since(since, Station)
+            limit = parse_limit(request.query_params.get('limit', None))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+        
+        stations, next_cursor, has_more = sync_page(self.get_queryset(), position, limit)
+        
+        return Response({
+            "type": "FeatureCollection",
+            "features": self.get_serializer(stations, many=True).data,
+            "next": next_cursor or since,
+            "has_more": has_more,
+        })
+
+
+class TransmissionSyncView(ReplicaReadMixin, APIView):
+    permission_classes = [IsAuthenticated | ReadOnly]
+    
+    def get(self, request):
+        supported_params = ['since', 'limit', 'station', 'variable']
+        
+        unsupported_params = [param for param in request.query_params.keys() if param not in supported_params]
+        if unsupported_params:
+            return Response({'error': f'Unsupported parameter(s): {", ".join(unsupported_params)}. '
+                                      f'Only Supports {", ".join(supported_params)}'}, status=400)
+        
+        # query params
+        since = request.query_params.get('since', None)
+        station = request.query_params.get('station', None)
+        variable = request.query_params.get('variable', None)
+        
+        try:
+            position = parse_since(since, Transmission) if since is not None else None
+            limit = parse_limit(request.query_params.get('limit', None))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+        
+        queryset = Transmission.objects.all()
+        if station is not None:
+            queryset = queryset.filter(station=station)
+        if variable is not None:
+            queryset = queryset.filter(variable=variable)
+        
+        # keyset page on the (updated_at, id) index
+        transmissions, next_cursor, has_more = sync_page(queryset, position, limit)
+        
+        return Response({
+            'results': TransmissionSerializer(transmissions, many=True).data,
+            'next': next_cursor or since,
+            'has_more': has_more,
+        })
 
 
 # Create your views here.
-class SynopTransmissionView(APIView):
+class SynopTransmissionView(ReplicaReadMixin, APIView):
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ["received_date", "station", "variable"]
     permission_classes = [IsAuthenticated | ReadOnly]
@@ -86,39 +198,39 @@ class SynopTransmissionView(APIView):
         if received_date:
             received_date = datetime.strptime(f"{received_date}T00:00:00Z", "%Y-%m-%dT%H:%M:%SZ").replace(
                 tzinfo=pytz.UTC)
+        
+        if frequency == 'daily_synop' and received_date:
+            # at most one row per station and hour, read straight from the transmissions
+            queryset = queryset.filter(received_date__date=received_date.date(), variable=variable).annotate(
+                synop_hour=ExtractHour('received_date', tzinfo=pytz.UTC)
+            ).values('synop_hour').annotate(
+                avg_received_rate=Avg('received_rate'),
+                avg_received=Avg('received'),
+                avg_expected=Avg('expected'),
+            )
+        else:
+            # the monthly per synop hour rollups, summed over the month, the year or all of them
+            rollups = TransmissionRollup.objects.filter(frequency=TransmissionRollup.FREQUENCY_SYNOP,
+                                                        period_start__year__gte=2023, variable=variable)
+            if station is not None:
+                rollups = rollups.filter(station=station)
             
-            # check the frequencies 
-            if frequency == 'monthly_synop':
-                queryset = queryset.filter(received_date__year=received_date.year,
-                                           received_date__month=received_date.month, variable=variable).order_by(
-                    'received_date__hour')
+            if received_date and frequency == 'monthly_synop':
+                rollups = rollups.filter(period_start=received_date.date().replace(day=1))
+            elif received_date and frequency == 'yearly_synop':
+                rollups = rollups.filter(period_start__year=received_date.year)
             
-            elif frequency == 'daily_synop':
-                queryset = queryset.filter(received_date__date=received_date.date(), variable=variable).order_by(
-                    'received_date__hour')
-            elif frequency == 'yearly_synop':
-                queryset = queryset.filter(received_date__year=received_date.year, variable=variable).order_by(
-                    'received_date__hour')
-        
-        # Extract the hour from the received_date and annotate the queryset
-        queryset = queryset.annotate(
-            synop_hour=ExtractHour('received_date', tzinfo=pytz.UTC)
-        )
+            queryset = rollups.values('synop_hour').annotate(**rollup_averages())
         
-        # Aggregate the queryset to calculate the average received_rate for each synoptic hour
-        queryset = queryset.values('synop_hour').annotate(
-            avg_received_rate=Avg('received_rate'),
-            avg_received=Avg('received'),
-            avg_expected=Avg('expected'),
-        )
+        queryset = queryset.order_by('synop_hour')
         
         # Format the result
         result = [
             {
                 'synop_hour': str(hour).zfill(2),  # Format hour to have leading zero if needed
-                'avg_received_rate': round(avg_rate, 0),  # Round to 0 decimal places
-                'avg_received': round(avg_received, 0),  # Round to 0 decimal places
-                'avg_expected': round(avg_expected, 0)  # Round to 0 decimal places
+                'avg_received_rate': round_average(avg_rate),  # Round to 0 decimal places
+                'avg_received': round_average(avg_received),
+                'avg_expected': round_average(avg_expected)
             }
             for hour, avg_rate, avg_received, avg_expected in
             queryset.values_list('synop_hour', 'avg_received_rate', 'avg_received', 'avg_expected')
@@ -128,14 +240,15 @@ class SynopTransmissionView(APIView):
         return Response(result)
 
 
-class MonthlyTransmissionView(APIView):
+class MonthlyTransmissionView(ReplicaReadMixin, APIView):
     
     def get(self, request):
         
-        queryset = Transmission.objects.filter(received_date__year__gte=2023)
+        queryset = TransmissionRollup.objects.filter(frequency=TransmissionRollup.FREQUENCY_MONTHLY,
+                                                     period_start__year__gte=2023)
         result = []
         
-        latest_year = queryset.values_list('received_date__year').order_by('received_date__year').last()
+        latest_year = queryset.values_list('period_start__year').order_by('period_start').last()
         supported_params = ['station', 'year', 'variable']
         
         validate = validate_params(request.query_params, supported_params)
@@ -151,17 +264,13 @@ class MonthlyTransmissionView(APIView):
         if station is not None:
             queryset = queryset.filter(station=station)
         
-        # Extract the month from the received_date and annotate the queryset
-        queryset = queryset.filter(variable=variable, received_date__year=year).annotate(
-            month=ExtractMonth('received_date')
+        # monthly rollups of the stations, one period_start per month
+        queryset = queryset.filter(variable=variable, period_start__year=year).annotate(
+            month=ExtractMonth('period_start')
         )
         
-        # Aggregate the queryset to calculate the average received_rate for each month
-        monthly_averages = queryset.values('month').order_by('received_date__month').annotate(
-            avg_received_rate=Avg('received_rate'),
-            avg_received=Avg('received'),
-            avg_expected=Avg('expected'),
-        )
+        # Aggregate the rollups to calculate the average received_rate for each month
+        monthly_averages = queryset.values('month').order_by('month').annotate(**rollup_averages())
         
         # Map month numbers to month names
         MONTH_NAMES = {
@@ -173,9 +282,9 @@ class MonthlyTransmissionView(APIView):
         result = [
             {
                 'month': MONTH_NAMES[month],
-                'avg_received_rate': round(avg_rate, 0),  # Round to 0 decimal places
-                'avg_received': round(avg_received, 0),  # Round to 0 decimal places
-                'avg_expected': round(avg_expected, 0)  # Round to 0 decimal places
+                'avg_received_rate': round_average(avg_rate),  # Round to 0 decimal places
+                'avg_received': round_average(avg_received),
+                'avg_expected': round_average(avg_expected)
             }
             for month, avg_rate, avg_received, avg_expected in
             monthly_averages.values_list('month', 'avg_received_rate', 'avg_received', 'avg_expected')
@@ -184,11 +293,66 @@ class MonthlyTransmissionView(APIView):
         return Response(result)
 
 
-class YearlyTransmissionView(APIView):
+class RegionTransmissionView(ReplicaReadMixin, APIView):
+    permission_classes = [IsAuthenticated | ReadOnly]
     
     def get(self, request):
+        supported_params = ['year', 'variable', 'level', 'country']
         
-        queryset = Transmission.objects.filter(received_date__year__gte=2023)
+        unsupported_params = [param for param in request.query_params.keys() if param not in supported_params]
+        if unsupported_params:
+            return Response({'error': f'Unsupported parameter(s): {", ".join(unsupported_params)}. '
+                                      f'Only Supports {", ".join(supported_params)}'}, status=400)
+        
+        queryset = RegionTransmission.objects.all()
+        latest_year = queryset.values_list('month__year').order_by('month__year').last()
+        
+        # query params
+        year = request.query_params.get('year', latest_year[0] if latest_year else None)
+        variable = request.query_params.get('variable', 'pressure')
+        level = request.query_params.get('level', str(RegionTransmission.LEVEL_ADMIN1))
+        country = request.query_params.get('country', None)
+        
+        if level not in ('0', '1'):
+            return Response({'error': 'Parameter "level" must be 0 (country) or 1 (admin level 1)'}, status=400)
+        
+        queryset = queryset.filter(variable=variable, level=level, month__year=year)
+        
+        if country is not None:
+            queryset = queryset.filter(country_code=country.upper())
+        
+        # all regions' series in one query
+        rows = queryset.order_by('gid', 'month').values_list(
+            'country_code', 'gid', 'name', 'month', 'avg_received_rate', 'avg_received', 'avg_expected',
+            'station_count'
+        )
+        
+        regions = {}
+        for country_code, gid, name, month, avg_rate, avg_received, avg_expected, station_count in rows:
+            region = regions.setdefault(gid, {
+                'gid': gid,
+                'name': name,
+                'country_code': country_code,
+                'level': int(level),
+                'series': []
+            })
+            region['series'].append({
+                'month': month.strftime('%B'),
+                'avg_received_rate': round(avg_rate, 0) if avg_rate is not None else None,
+                'avg_received': round(avg_received, 0) if avg_received is not None else None,
+                'avg_expected': round(avg_expected, 0) if avg_expected is not None else None,
+                'station_count': station_count,
+            })
+        
+        return Response(list(regions.values()))
+
+
+class YearlyTransmissionView(ReplicaReadMixin, APIView):
+    
+    def get(self, request):
+        
+        queryset = TransmissionRollup.objects.filter(frequency=TransmissionRollup.FREQUENCY_YEARLY,
+                                                     period_start__year__gte=2023)
         result = []
         
         supported_params = ['station', 'variable']
@@ -207,25 +371,21 @@ class YearlyTransmissionView(APIView):
         
         queryset = queryset.filter(variable=variable)
         
-        # Extract the month from the received_date and annotate the queryset
+        # yearly rollups of the stations, one period_start per year
         queryset = queryset.annotate(
-            year=ExtractYear('received_date')
+            year=ExtractYear('period_start')
         )
         
-        # Aggregate the queryset to calculate the average received_rate for each month
-        yearly_averages = queryset.values('year').order_by('received_date__year').annotate(
-            avg_received_rate=Avg('received_rate'),
-            avg_received=Avg('received'),
-            avg_expected=Avg('expected'),
-        )
+        # Aggregate the rollups to calculate the average received_rate for each year
+        yearly_averages = queryset.values('year').order_by('year').annotate(**rollup_averages())
         
         # Format the result
         result = [
             {
                 'year': year,
-                'avg_received_rate': round(avg_rate, 0),  # Round to 0 decimal places
-                'avg_received': round(avg_received, 0),  # Round to 0 decimal places
-                'avg_expected': round(avg_expected, 0)  # Round to 0 decimal places
+                'avg_received_rate': round_average(avg_rate),  # Round to 0 decimal places
+                'avg_received': round_average(avg_received),
+                'avg_expected': round_average(avg_expected)
             }
             for year, avg_rate, avg_received, avg_expected in
             yearly_averages.values_list('year', 'avg_received_rate', 'avg_received', 'avg_expected')
@@ -234,7 +394,134 @@ class YearlyTransmissionView(APIView):
         return Response(result)
 
 
-class AverageMonthlyReceivedRateGeom(APIView):
+class CenterTransmissionView(ReplicaReadMixin, APIView):
+    permission_classes = [IsAuthenticated | ReadOnly]
+    
+    def get(self, request):
+        supported_params = ['station', 'year', 'month', 'variable']
+        
+        unsupported_params = [param for param in request.query_params.keys() if param not in supported_params]
+        if unsupported_params:
+            return Response({'error': f'Unsupported parameter(s): {", ".join(unsupported_params)}. '
+                                      f'Only Supports {", ".join(supported_params)}'}, status=400)
+        
+        queryset = CenterTransmission.objects.filter(transmission__received_date__year__gte=2023)
+        # the latest year with per center counts, not of any transmission
+        latest_year = CenterTransmission.objects.values_list('transmission__received_date__year') \
+            .order_by('transmission__received_date').last()
+        
+        # query params
+        station = request.query_params.get('station', None)
+        year = request.query_params.get('year', latest_year[0] if latest_year else None)
+        month = request.query_params.get('month', None)
+        variable = request.query_params.get('variable', 'pressure')
+        
+        queryset = queryset.filter(transmission__variable=variable, transmission__received_date__year=year)
+        
+        if station is not None:
+            queryset = queryset.filter(transmission__station=station)
+        
+        if month is not None:
+            queryset = queryset.filter(transmission__received_date__month=month)
+        
+        # the rate of each period, averaged like the received_rate of the other endpoints.
+        # periods without expected transmissions count as 0%, as ingest stores them
+        received_rate = Case(
+            When(expected__gt=0, then=Cast(Coalesce('received', 0), FloatField()) * 100 / F('expected')),
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+        
+        # one grouped query for all centers
+        centers = queryset.values('center').order_by('center').annotate(
+            avg_received_rate=Avg(received_rate),
+            avg_received=Avg('received'),
+            avg_expected=Avg('expected'),
+        )
+        
+        result = [
+            {
+                'center': center['center'],
+                'avg_received_rate': round(center['avg_received_rate'], 0)
+                if center['avg_received_rate'] is not None else None,
+                'avg_received': round(center['avg_received'], 0) if center['avg_received'] is not None else None,
+                'avg_expected': round(center['avg_expected'], 0) if center['avg_expected'] is not None else None,
+            }
+            for center in centers
+        ]
+        
+        return Response(result)
+
+
+class TransmissionSeriesView(ReplicaReadMixin, APIView):
+    permission_classes = [IsAuthenticated | ReadOnly]
+    
+    def get(self, request):
+        supported_params = ['station', 'variable', 'start_date', 'end_date', 'points', 'method']
+        
+        unsupported_params = [param for param in request.query_params.keys() if param not in supported_params]
+        if unsupported_params:
+            return Response({'error': f'Unsupported parameter(s): {", ".join(unsupported_params)}. '
+                                      f'Only Supports {", ".join(supported_params)}'}, status=400)
+        
+        # query params
+        station = request.query_params.get('station', None)
+        variable = request.query_params.get('variable', 'pressure')
+        start_date = request.query_params.get('start_date', None)
+        end_date = request.query_params.get('end_date', None)
+        method = request.query_params.get('method', METHOD_LTTB)
+        
+        if station is None:
+            return Response({'error': 'Parameter "station" is required.'}, status=400)
+        
+        if method not in METHODS:
+            return Response({'error': f'Parameter "method" must be one of {", ".join(METHODS)}'}, status=400)
+        
+        try:
+            points = int(request.query_params.get('points', DEFAULT_SERIES_POINTS))
+        except ValueError:
+            return Response({'error': 'Parameter "points" must be an integer'}, status=400)
+        if not 3 <= points <= MAX_SERIES_POINTS:
+            return Response({'error': f'Parameter "points" must be between 3 and {MAX_SERIES_POINTS}'}, status=400)
+        
+        queryset = Transmission.objects.filter(station=station, variable=variable)
+        
+        try:
+            if start_date is not None:
+                queryset = queryset.filter(
+                    received_date__gte=datetime.strptime(start_date, "%Y-%m-%d").replace(tzinfo=pytz.UTC))
+            if end_date is not None:
+                queryset = queryset.filter(
+                    received_date__lt=datetime.strptime(end_date, "%Y-%m-%d").replace(tzinfo=pytz.UTC) + timedelta(days=1))
+        except ValueError:
+            return Response({'error': 'Invalid date format. Use YYYY-MM-DD format.'}, status=400)
+        
+        rows = list(queryset.order_by('received_date').values_list('received_date', 'received_rate'))
+        
+        timestamps, rates = downsample([received_date.timestamp() for received_date, _ in rows],
+                                       [received_rate for _, received_rate in rows], points, method=method)
+        
+        result = {
+            'station': station,
+            'variable': variable,
+            'method': method,
+            'total': len(rows),
+            'series': [
+                {
+                    'received_date': datetime.fromtimestamp(timestamp, tz=pytz.UTC).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    'received_rate': round(rate, 2),
+                }
+                for timestamp, rate in zip(timestamps.tolist(), rates.tolist())
+            ],
+        }
+        
+        return Response(result)
+
+
+@method_decorator(compress_page, name='dispatch')
+class AverageMonthlyReceivedRateGeom(ReplicaReadMixin, APIView):
+    renderer_classes = [GeoJSONRenderer]
+    
     def get(self, request):
         month = request.query_params.get('month', None)
         year = request.query_params.get('year', None)
@@ -267,7 +554,7 @@ class AverageMonthlyReceivedRateGeom(APIView):
             average_received_rate = float(data['average_received_rate']) if data[
                                                                                 'average_received_rate'] is not None else None
             
-            geometry = json.loads(data['station_geometry'].geojson)
+            point = data['station_geometry']
             
             feature = {
                 "type": "Feature",
@@ -278,8 +565,57 @@ class AverageMonthlyReceivedRateGeom(APIView):
                     "variable": data['variable'],
                     "average_received_rate": average_received_rate
                 },
-                "geometry": geometry
+                "geometry": {
+                    "type": "Point",
+                    "coordinates": [point.x, point.y]
+                }
             }
             feature_collection["features"].append(feature)
         
         return Response(feature_collection)
+
+
+class StationAlertView(ReplicaReadMixin, APIView):
+    permission_classes = [IsAuthenticated | ReadOnly]
+    
+    def get(self, request):
+        supported_params = ['variable', 'status']
+        alert_statuses = [StationHealth.STATUS_SILENT, StationHealth.STATUS_DEGRADED]
+        
+        unsupported_params = [param for param in request.query_params.keys() if param not in supported_params]
+        if unsupported_params:
+            return Response({'error': f'Unsupported parameter(s): {", ".join(unsupported_params)}. '
+                                      f'Only Supports {", ".join(supported_params)}'}, status=400)
+        
+        # query params
+        variable = request.query_params.get('variable', 'pressure')
+        status = request.query_params.get('status', None)
+        
+        if status is not None:
+            if status not in alert_statuses:
+                return Response({'error': f'Parameter "status" must be one of {", ".join(alert_statuses)}'},
+                                status=400)
+            alert_statuses = [status]
+        
+        # single indexed lookup on (variable, status)
+        alerts = StationHealth.objects.filter(variable=variable, status__in=alert_statuses).values_list(
+            'station__wigos_id', 'station__name', 'status', 'ewma_received_rate', 'consecutive_zero_periods',
+            'last_received_rate', 'last_received_date'
+        ).order_by('status', 'ewma_received_rate')
+        
+        result = [
+            {
+                'wigos_id': wigos_id,
+                'name': name,
+                'variable': variable,
+                'status': status,
+                'avg_received_rate': round(ewma_received_rate, 0),  # Round to 0 decimal places
+                'consecutive_zero_periods': consecutive_zero_periods,
+                'last_received_rate': round(last_received_rate, 0),  # Round to 0 decimal places
+                'last_received_date': last_received_date.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            }
+            for wigos_id, name, status, ewma_received_rate, consecutive_zero_periods, last_received_rate, last_received_date
+            in alerts
+        ]
+        
+        return Response(result)
@@ -106,6 +106,20 @@ DATABASES = {
     "default": env.db()
 }
 
+# keep connections open between requests
+DATABASES["default"]["CONN_MAX_AGE"] = env.int("CONN_MAX_AGE", default=60)
+DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+
+# optional read replica for the WDQMS API views
+if env("REPLICA_DATABASE_URL", default=None):
+    DATABASES["replica"] = env.db("REPLICA_DATABASE_URL")
+    DATABASES["replica"]["CONN_MAX_AGE"] = env.int("CONN_MAX_AGE", default=60)
+    DATABASES["replica"]["CONN_HEALTH_CHECKS"] = True
+    DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+    WDQMS_READ_DATABASE = "replica"
+
+DATABASE_ROUTERS = ["climweb_wdqms.routers.WDQMSRouter"]
+
 
 
 # Password validation
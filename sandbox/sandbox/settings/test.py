@@ -0,0 +1,12 @@
+import os
+
+# SpatiaLite unless the environment gives another database. The test runner creates its own test databases
+os.environ.setdefault("DATABASE_URL", "spatialite:///wdqms.sqlite3")
+
+from .dev import *
+
+# a second database standing in for the read replica. Unlike the REPLICA_DATABASE_URL alias, it is not a test mirror
+# of the default one, so the replica routing tests run against their own copy
+DATABASES["replica"] = {**DATABASES["default"], "NAME": f"{DATABASES['default']['NAME']}_replica"}
+
+WDQMS_READ_DATABASE = "replica"